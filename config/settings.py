@@ -24,6 +24,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.PerformanceMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -37,7 +38,7 @@ ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.template_backends.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -52,11 +53,83 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production").strip()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").strip()
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "65536"))
+
+DB_ENGINE = os.getenv("DB_ENGINE", "sqlite").strip().lower()
+
+if DB_ENGINE == "postgresql":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.postgresql",
+            "NAME": os.getenv("DB_NAME", "firerisk"),
+            "USER": os.getenv("DB_USER", "firerisk"),
+            "PASSWORD": os.getenv("DB_PASSWORD", ""),
+            "HOST": os.getenv("DB_HOST", "localhost"),
+            "PORT": os.getenv("DB_PORT", "5432"),
+            "OPTIONS": {
+                "pool": {
+                    "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+                    "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                    "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+                },
+            },
+        }
+    }
+    if os.getenv("DB_REPLICA_HOST"):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": os.getenv("DB_REPLICA_HOST"),
+            "PORT": os.getenv("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+            "OPTIONS": {"pool": dict(DATABASES["default"]["OPTIONS"]["pool"])},
+            "TEST": {"MIRROR": "default"},
+        }
+else:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv("SQLITE_PATH") or BASE_DIR / "db.sqlite3",
+            "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "600")) if SQLITE_PROFILE == "production" else 0,
+            "CONN_HEALTH_CHECKS": True,
+            "OPTIONS": {"transaction_mode": "IMMEDIATE"} if SQLITE_PROFILE == "production" else {},
+        }
     }
+
+DATABASE_ROUTERS = ["core.db_routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", "5"))
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "default",
+    },
+    "upstream": {
+        "BACKEND": os.getenv("UPSTREAM_CACHE_BACKEND", "core.cache_backends.SharedFileCache"),
+        "LOCATION": os.getenv("UPSTREAM_CACHE_LOCATION") or BASE_DIR / "cache" / "upstream",
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("UPSTREAM_CACHE_MAX_ENTRIES", "2000")),
+            "CULL_FREQUENCY": 10,
+        },
+    },
+    "state": {
+        "BACKEND": os.getenv("STATE_CACHE_BACKEND", "core.cache_backends.DurableFileCache"),
+        "LOCATION": os.getenv("STATE_CACHE_LOCATION") or BASE_DIR / "cache" / "state",
+        "TIMEOUT": None,
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("STATE_CACHE_MAX_ENTRIES", "20000")),
+        },
+    },
+    "pages": {
+        "BACKEND": os.getenv("PAGE_CACHE_BACKEND", "core.cache_backends.SharedFileCache"),
+        "LOCATION": os.getenv("PAGE_CACHE_LOCATION") or BASE_DIR / "cache" / "pages",
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "5000")),
+            "CULL_FREQUENCY": 10,
+        },
+    },
 }
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -82,6 +155,54 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "").strip()
 FIRMS_MAP_KEY = os.getenv("FIRMS_MAP_KEY", "").strip()
 FIRMS_SOURCE = os.getenv("FIRMS_SOURCE", "VIIRS_SNPP_NRT").strip()
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5").strip()
+FIRMS_BASE_URL = os.getenv("FIRMS_BASE_URL", "https://firms.modaps.eosdis.nasa.gov/api/area/csv").strip()
+
+UPSTREAM_CACHE_ALIAS = "upstream"
+STATE_CACHE_ALIAS = "state"
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+WEATHER_CACHE_NEGATIVE_TTL = int(os.getenv("WEATHER_CACHE_NEGATIVE_TTL", "120"))
+WEATHER_CITY_ID_TTL = int(os.getenv("WEATHER_CITY_ID_TTL", "2592000"))
+WEATHER_BATCH_CONCURRENCY = int(os.getenv("WEATHER_BATCH_CONCURRENCY", "4"))
+WEATHER_DEADLINE = float(os.getenv("WEATHER_DEADLINE", "8"))
+FIRMS_TILE_DEG = float(os.getenv("FIRMS_TILE_DEG", "0.5"))
+FIRMS_CACHE_TTL = int(os.getenv("FIRMS_CACHE_TTL", "900"))
+FIRMS_FETCH_MODE = os.getenv("FIRMS_FETCH_MODE", "sequential").strip()
+FIRMS_FANOUT_POLICY = os.getenv("FIRMS_FANOUT_POLICY", "first").strip()
+FIRMS_FANOUT_DEADLINE = float(os.getenv("FIRMS_FANOUT_DEADLINE", "20"))
+FIRMS_SEARCH_BUDGET = float(os.getenv("FIRMS_SEARCH_BUDGET", "6"))
+UPSTREAM_WORKERS = int(os.getenv("UPSTREAM_WORKERS", "16"))
+FIRMS_WORKERS = int(os.getenv("FIRMS_WORKERS", "8"))
+
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+HTTP_HOST_CONCURRENCY = int(os.getenv("HTTP_HOST_CONCURRENCY", "8"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", "0.3"))
+
+CIRCUIT_WINDOW = int(os.getenv("CIRCUIT_WINDOW", "60"))
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+CIRCUIT_SLOW_CALL = float(os.getenv("CIRCUIT_SLOW_CALL", "5"))
+CIRCUIT_OPEN_SECONDS = int(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+UPSTREAM_STALE_TTL = int(os.getenv("UPSTREAM_STALE_TTL", "21600"))
+SINGLE_FLIGHT_CACHE_LOCK = os.getenv("SINGLE_FLIGHT_CACHE_LOCK", "False").lower() == "true"
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "30"))
+
+SNAPSHOT_REFRESH_INTERVAL = int(os.getenv("SNAPSHOT_REFRESH_INTERVAL", "900"))
+SNAPSHOT_MAX_AGE = int(os.getenv("SNAPSHOT_MAX_AGE", "1800"))
+SNAPSHOT_CITIES_PER_MINUTE = int(os.getenv("SNAPSHOT_CITIES_PER_MINUTE", "50"))
+
+SEARCH_WRITE_MODE = os.getenv("SEARCH_WRITE_MODE", "sync").strip()
+SEARCH_QUEUE_PATH = os.getenv("SEARCH_QUEUE_PATH") or BASE_DIR / "search_queue.sqlite3"
+SEARCH_QUEUE_BATCH = int(os.getenv("SEARCH_QUEUE_BATCH", "500"))
+SEARCH_QUEUE_FLUSH_INTERVAL = float(os.getenv("SEARCH_QUEUE_FLUSH_INTERVAL", "1"))
+
+PAGE_CACHE_ALIAS = "pages"
+PAGE_CACHE_TTL = int(os.getenv("PAGE_CACHE_TTL", "600"))
+RISK_MAP_CLUSTER_MAX_ZOOM = int(os.getenv("RISK_MAP_CLUSTER_MAX_ZOOM", "9"))
+RISK_MAP_CLUSTER_CELL_DEG = float(os.getenv("RISK_MAP_CLUSTER_CELL_DEG", "40"))
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
 
 LOGIN_REDIRECT_URL = "home"
 LOGOUT_REDIRECT_URL = "home"
@@ -3,11 +3,14 @@ from django.urls import include, path
 
 from core.views import (
     favorites_view,
+    history_export_view,
     history_view,
     home_view,
+    metrics_view,
     profile_view,
     report_detail_view,
     reports_view,
+    risk_map_view,
     signup_view,
     stats_view,
     toggle_favorite_city_view,
@@ -20,11 +23,14 @@ urlpatterns = [
     path("weather/", weather_search_view, name="weather_search"),
     path("favorites/", favorites_view, name="favorites"),
     path("history/", history_view, name="history"),
+    path("history/export/", history_export_view, name="history_export"),
     path("favorites/toggle/", toggle_favorite_city_view, name="favorite_toggle"),
     path("profile/", profile_view, name="profile"),
     path("stats/", stats_view, name="stats"),
+    path("stats/map.geojson", risk_map_view, name="risk_map"),
     path("reports/", reports_view, name="reports"),
     path("reports/<int:report_id>/", report_detail_view, name="report_detail"),
+    path("metrics", metrics_view, name="metrics"),
     path("accounts/signup/", signup_view, name="signup"),
     path("accounts/", include("django.contrib.auth.urls")),
 ]
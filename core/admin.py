@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import FavoriteCity, RiskReport, WeatherSearch
+from .models import CitySnapshot, FavoriteCity, RiskReport, UserCityStats, UserSearchStats, WeatherSearch
 
 
 @admin.register(WeatherSearch)
@@ -9,6 +9,7 @@ class WeatherSearchAdmin(admin.ModelAdmin):
     list_filter = ("is_success", "created_at")
     search_fields = ("city", "user__username", "user__email")
     readonly_fields = ("created_at",)
+    ordering = ("-created_at",)
 
 
 @admin.register(FavoriteCity)
@@ -24,3 +25,23 @@ class RiskReportAdmin(admin.ModelAdmin):
     list_filter = ("day",)
     search_fields = ("user__username", "user__email")
     readonly_fields = ("created_at",)
+
+
+@admin.register(CitySnapshot)
+class CitySnapshotAdmin(admin.ModelAdmin):
+    list_display = ("id", "city", "refreshed_at", "temp", "risk_score", "firms_count")
+    search_fields = ("city", "city_key")
+    readonly_fields = ("refreshed_at",)
+
+
+@admin.register(UserSearchStats)
+class UserSearchStatsAdmin(admin.ModelAdmin):
+    list_display = ("user", "total", "success", "errors")
+    search_fields = ("user__username", "user__email")
+
+
+@admin.register(UserCityStats)
+class UserCityStatsAdmin(admin.ModelAdmin):
+    list_display = ("id", "city", "user", "success_count", "temp_count")
+    search_fields = ("city", "user__username", "user__email")
+    raw_id_fields = ("last_search",)
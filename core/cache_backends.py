@@ -0,0 +1,85 @@
+import os
+import pickle
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from hashlib import md5
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files import locks
+from django.core.files.move import file_move_safe
+
+LOCK_STRIPES = 64
+
+
+class SharedFileCache(FileBasedCache):
+    evict_live = True
+    cull_every = 50
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._writes = 0
+
+    @contextmanager
+    def _locked(self, key, version=None):
+        digest = md5(self.make_key(key, version).encode(), usedforsecurity=False).hexdigest()
+        self._createdir()
+        with open(os.path.join(self._dir, f"stripe-{int(digest, 16) % LOCK_STRIPES}.lock"), "ab") as f:
+            locks.lock(f, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(f)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked(key, version):
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        fname = self._key_to_file(key, version)
+        with self._locked(key, version):
+            try:
+                with open(fname, "rb") as f:
+                    expiry = pickle.load(f)
+                    value = pickle.loads(zlib.decompress(f.read()))
+            except (FileNotFoundError, EOFError):
+                raise ValueError(f"Key '{key}' not found")
+            if expiry is not None and expiry < time.time():
+                self._delete(fname)
+                raise ValueError(f"Key '{key}' not found")
+
+            value += delta
+            fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+            renamed = False
+            try:
+                with open(fd, "wb") as f:
+                    f.write(pickle.dumps(expiry, self.pickle_protocol))
+                    f.write(zlib.compress(pickle.dumps(value, self.pickle_protocol)))
+                file_move_safe(tmp_path, fname, allow_overwrite=True)
+                renamed = True
+            finally:
+                if not renamed:
+                    os.remove(tmp_path)
+            return value
+
+    def _cull(self):
+        self._writes += 1
+        if self._writes % self.cull_every:
+            return
+        filelist = self._list_cache_files()
+        if len(filelist) < self._max_entries:
+            return
+        if self.evict_live:
+            return super()._cull()
+        for fname in filelist:
+            try:
+                with open(fname, "rb") as f:
+                    self._is_expired(f)
+            except FileNotFoundError:
+                pass
+
+
+class DurableFileCache(SharedFileCache):
+    evict_live = False
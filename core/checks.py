@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+ATOMIC_CACHES = PROCESS_LOCAL_CACHES + (
+    "core.cache_backends.SharedFileCache",
+    "core.cache_backends.DurableFileCache",
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+)
+
+
+def cache_is_process_local(alias: str) -> bool:
+    return settings.CACHES.get(alias, {}).get("BACKEND") in PROCESS_LOCAL_CACHES
+
+
+def cache_is_atomic(alias: str) -> bool:
+    return settings.CACHES.get(alias, {}).get("BACKEND") in ATOMIC_CACHES
+
+
+@register()
+def shared_caches_check(app_configs, **kwargs):
+    errors = []
+    if cache_is_process_local(getattr(settings, "UPSTREAM_CACHE_ALIAS", "default")):
+        errors.append(
+            Warning(
+                "Кеш внешних API хранится в памяти процесса.",
+                hint=(
+                    "Ответы OpenWeather и FIRMS и их резервные копии не общие для воркеров: "
+                    "каждый процесс заново расходует квоту ключей. "
+                    "Задайте UPSTREAM_CACHE_BACKEND (core.cache_backends.SharedFileCache, Redis)."
+                ),
+                id="core.W001",
+            )
+        )
+    state_alias = getattr(settings, "STATE_CACHE_ALIAS", "default")
+    if cache_is_process_local(state_alias):
+        errors.append(
+            Warning(
+                "Общее состояние (предохранители, счётчики, версии страниц) хранится в памяти процесса.",
+                hint=(
+                    "Каждый воркер открывает предохранитель сам, upstream_status и /metrics видят только "
+                    "собственный процесс, а новый поиск сбрасывает кеш страниц только в том воркере, "
+                    "который его обработал. Задайте STATE_CACHE_BACKEND "
+                    "(core.cache_backends.DurableFileCache, Redis)."
+                ),
+                id="core.W003",
+            )
+        )
+    elif not cache_is_atomic(state_alias):
+        errors.append(
+            Warning(
+                "Бэкенд STATE_CACHE_BACKEND не гарантирует атомарные add и incr между процессами.",
+                hint=(
+                    "Одновременные вызовы теряют часть приращений счётчиков предохранителей, а пробный "
+                    "запрос полуоткрытого предохранителя может уйти из нескольких воркеров сразу. "
+                    "Используйте core.cache_backends.DurableFileCache, Redis или Memcached."
+                ),
+                id="core.W004",
+            )
+        )
+    if getattr(settings, "SINGLE_FLIGHT_CACHE_LOCK", False) and (
+        cache_is_process_local(state_alias) or not cache_is_atomic(state_alias)
+    ):
+        errors.append(
+            Error(
+                "SINGLE_FLIGHT_CACHE_LOCK требует общего бэкенда STATE_CACHE_BACKEND с атомарным add.",
+                hint=(
+                    "Иначе блокировку одновременно получают несколько воркеров и каждый идёт во внешний API. "
+                    "Используйте core.cache_backends.DurableFileCache, Redis или Memcached "
+                    "или выключите SINGLE_FLIGHT_CACHE_LOCK."
+                ),
+                id="core.E002",
+            )
+        )
+    if cache_is_process_local(state_alias) and getattr(settings, "SEARCH_WRITE_MODE", "sync") == "queue":
+        errors.append(
+            Error(
+                "SEARCH_WRITE_MODE=queue требует общего хранилища STATE_CACHE_BACKEND.",
+                hint=(
+                    "Поиски из журнала записывает отдельный процесс flush_search_queue; если версии страниц и метки "
+                    "чтения с основной базы хранятся в памяти процесса, веб-воркеры не узнают о новых записях. "
+                    "Задайте STATE_CACHE_BACKEND (core.cache_backends.DurableFileCache, Redis)."
+                ),
+                id="core.E001",
+            )
+        )
+    return errors
@@ -0,0 +1,71 @@
+from contextvars import ContextVar
+from functools import wraps
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_ALIAS = "replica"
+
+_read_alias: ContextVar[Optional[str]] = ContextVar("read_alias", default=None)
+
+
+def _pin_cache():
+    return caches[getattr(settings, "STATE_CACHE_ALIAS", "default")]
+
+
+def _pin_key(user_id: int) -> str:
+    return f"db:pin:{user_id}"
+
+
+def replica_configured() -> bool:
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def pin_user_to_primary(user_id: int) -> None:
+    seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+    if replica_configured() and seconds > 0:
+        _pin_cache().set(_pin_key(user_id), 1, seconds)
+
+
+def user_pinned_to_primary(user_id: int) -> bool:
+    return bool(_pin_cache().get(_pin_key(user_id)))
+
+
+def read_from_replica(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not replica_configured() or user_pinned_to_primary(request.user.id):
+            return view(request, *args, **kwargs)
+
+        token = _read_alias.set(REPLICA_ALIAS)
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or model._meta.app_label != "core":
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_ALIAS:
+            return False
+        return None
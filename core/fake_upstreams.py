@@ -0,0 +1,135 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+
+def _city_seed(name: str) -> int:
+    return int(hashlib.sha1(name.casefold().encode()).hexdigest()[:8], 16)
+
+
+def fake_weather(name: str, city_id: Optional[int] = None) -> Dict[str, Any]:
+    rng = random.Random(_city_seed(name))
+    return {
+        "id": city_id or _city_seed(name) % 10_000_000,
+        "name": name,
+        "sys": {"country": "RU"},
+        "coord": {"lat": round(rng.uniform(42, 70), 4), "lon": round(rng.uniform(28, 140), 4)},
+        "main": {
+            "temp": round(rng.uniform(-25, 35), 2),
+            "feels_like": round(rng.uniform(-30, 35), 2),
+            "humidity": rng.randint(15, 100),
+        },
+        "wind": {"speed": round(rng.uniform(0, 15), 1)},
+        "weather": [{"description": "ясно", "icon": "01d"}],
+    }
+
+
+class FakeUpstreamServer:
+    def __init__(self, *, latency: float = 0.0, firms_rows: int = 100, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.firms_rows = firms_rows
+        self.requests = 0
+        self._names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-upstreams", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeUpstreamServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _weather(self, query: Dict[str, list]) -> Dict[str, Any]:
+        name = (query.get("q") or [""])[0]
+        data = fake_weather(name)
+        with self._lock:
+            self._names[data["id"]] = name
+        return data
+
+    def _group(self, query: Dict[str, list]) -> Dict[str, Any]:
+        items = []
+        for raw in (query.get("id") or [""])[0].split(","):
+            with self._lock:
+                name = self._names.get(int(raw)) if raw.isdigit() else None
+            if name:
+                items.append(fake_weather(name, int(raw)))
+        return {"cnt": len(items), "list": items}
+
+    def _firms_csv(self, path: str) -> str:
+        parts = path.rstrip("/").split("/")
+        west, south, east, north = (float(v) for v in parts[-2].split(","))
+        rng = random.Random(path)
+        today = date.today()
+        lines = ["latitude,longitude,confidence,acq_date,acq_time"]
+        for _ in range(self.firms_rows):
+            lines.append(
+                f"{rng.uniform(south, north):.4f},{rng.uniform(west, east):.4f},{rng.choice('lnh')},"
+                f"{today - timedelta(days=rng.randint(0, 6))},{rng.randint(0, 2359):04d}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: str, content_type: str) -> None:
+                payload = body.encode()
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                with server._lock:
+                    server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+
+                url = urlsplit(self.path)
+                query = parse_qs(url.query)
+
+                if url.path.endswith("/weather"):
+                    self._send(200, json.dumps(server._weather(query), ensure_ascii=False), "application/json")
+                elif url.path.endswith("/group"):
+                    self._send(200, json.dumps(server._group(query), ensure_ascii=False), "application/json")
+                elif "/firms/" in url.path:
+                    self._send(200, server._firms_csv(url.path), "text/csv")
+                else:
+                    self._send(404, json.dumps({"cod": "404", "message": "not found"}), "application/json")
+
+        return Handler
+
+    def settings_overrides(self) -> Dict[str, Any]:
+        return {
+            "OPENWEATHER_API_KEY": "bench",
+            "OPENWEATHER_BASE_URL": f"{self.base_url}/openweather",
+            "FIRMS_MAP_KEY": "bench",
+            "FIRMS_BASE_URL": f"{self.base_url}/firms",
+        }
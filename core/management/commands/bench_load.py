@@ -0,0 +1,202 @@
+import json
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.utils import timezone
+
+from core.fake_upstreams import FakeUpstreamServer
+from core.seeding import seed_dataset
+
+SCENARIOS = ("search", "stats", "favorites", "profile")
+
+_QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _git_revision() -> str:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=5,
+        )
+        return out.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный замер поиска, статистики, избранного и профиля с локальными заглушками OpenWeather и FIRMS. "
+        "Запускать на отдельной базе: команда создаёт пользователей bench-* и их историю."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Через запятую: " + ", ".join(SCENARIOS))
+        parser.add_argument("--requests", type=int, default=200, help="Запросов на сценарий.")
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument("--seed-searches", type=int, default=0, help="Сгенерировать историю перед замером.")
+        parser.add_argument("--cities", type=int, default=50, help="Сколько разных городов ищет сценарий search.")
+        parser.add_argument("--latency", type=float, default=0.05, help="Задержка заглушек API, сек.")
+        parser.add_argument("--firms-rows", type=int, default=200, help="Строк в ответе заглушки FIRMS.")
+        parser.add_argument("--output", default="benchmarks/results.jsonl", help="Куда дописать результат.")
+        parser.add_argument("--label", default="", help="Произвольная метка прогона.")
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Запустить при DEBUG=False или если в базе есть пользователи, кроме bench-*.",
+        )
+
+    def _bench_users(self, options) -> List[Any]:
+        User = get_user_model()
+        if not options["force"]:
+            if not settings.DEBUG:
+                raise CommandError("DEBUG=False: похоже на рабочую базу. Запустите на отдельной базе или с --force.")
+            if User.objects.exclude(username__startswith="bench-").exists():
+                raise CommandError(
+                    "В базе есть пользователи, кроме bench-*: команда удаляет bench-* и пишет историю поисков. "
+                    "Запустите на отдельной базе или с --force."
+                )
+        users = list(User.objects.filter(username__startswith="bench-").order_by("id")[: options["users"]])
+        if options["seed_searches"] or not users:
+            self.stdout.write(f"Генерация данных: {options['seed_searches']} запросов, {options['users']} пользователей...")
+            started = time.perf_counter()
+            User.objects.filter(username__startswith="bench-").delete()
+            users = seed_dataset(searches=options["seed_searches"], users=options["users"], prefix="bench")
+            self.stdout.write(f"  готово за {time.perf_counter() - started:.1f} с")
+        return users
+
+    def _run(self, scenario: str, users: List[Any], options) -> Dict[str, Any]:
+        local = threading.local()
+        counter = iter(range(options["requests"]))
+        lock = threading.Lock()
+
+        def one(i: int):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = Client()
+                client.force_login(users[i % len(users)])
+
+            started = time.perf_counter()
+            if scenario == "search":
+                with lock:
+                    city = f"Bench-City-{next(counter) % options['cities']}"
+                response = client.post("/weather/", {"city": city})
+            elif scenario == "stats":
+                response = client.get("/stats/")
+            elif scenario == "favorites":
+                response = client.get("/favorites/?sort=risk")
+            else:
+                response = client.get("/profile/")
+            elapsed = time.perf_counter() - started
+
+            match = _QUERIES.search(response.get("Server-Timing", ""))
+            return elapsed, int(match.group(1)) if match else 0, response.status_code
+
+        def worker(indices):
+            try:
+                return [one(i) for i in indices]
+            finally:
+                connection.close()
+
+        concurrency = max(1, options["concurrency"])
+        shards = [range(k, options["requests"], concurrency) for k in range(concurrency)]
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench") as pool:
+            samples = [s for shard in pool.map(worker, shards) for s in shard]
+        wall = time.perf_counter() - started
+
+        latencies = [s[0] for s in samples]
+        return {
+            "requests": len(samples),
+            "errors": sum(1 for s in samples if s[2] >= 400),
+            "rps": round(len(samples) / wall, 1) if wall else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+            "queries_per_request": round(sum(s[1] for s in samples) / len(samples), 1) if samples else 0.0,
+        }
+
+    def _previous(self, path: Path, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not path.exists():
+            return None
+        previous = None
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry.get("params") == params:
+                    previous = entry
+        return previous
+
+    def handle(self, *args, **options):
+        scenarios = [s.strip() for s in options["scenarios"].split(",") if s.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+        users = self._bench_users(options)
+
+        params = {
+            key: options[key]
+            for key in ("requests", "concurrency", "users", "cities", "latency", "firms_rows")
+        }
+        params["scenarios"] = scenarios
+        params["database"] = connection.vendor
+
+        results: Dict[str, Dict[str, Any]] = {}
+        with FakeUpstreamServer(latency=options["latency"], firms_rows=options["firms_rows"]) as upstream:
+            with override_settings(**upstream.settings_overrides(), ALLOWED_HOSTS=["testserver"]):
+                for scenario in scenarios:
+                    results[scenario] = self._run(scenario, users, options)
+                    r = results[scenario]
+                    self.stdout.write(
+                        f"{scenario:<10} {r['rps']:>8} req/s  p50 {r['p50_ms']:>7} ms  p95 {r['p95_ms']:>7} ms  "
+                        f"p99 {r['p99_ms']:>7} ms  {r['queries_per_request']:>5} SQL/req  ошибок {r['errors']}"
+                    )
+            self.stdout.write(f"Запросов к заглушкам API: {upstream.requests}")
+
+        output = Path(options["output"])
+        previous = self._previous(output, params)
+        if previous:
+            self.stdout.write(f"Сравнение с {previous['revision']} ({previous['at']}):")
+            for scenario, r in results.items():
+                before = previous["results"].get(scenario)
+                if not before or not before["rps"]:
+                    continue
+                change = 100.0 * (r["rps"] - before["rps"]) / before["rps"]
+                self.stdout.write(
+                    f"  {scenario:<10} req/s {before['rps']} -> {r['rps']} ({change:+.1f}%), "
+                    f"p95 {before['p95_ms']} -> {r['p95_ms']} ms"
+                )
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        entry = {
+            "at": timezone.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "label": options["label"],
+            "params": params,
+            "results": results,
+        }
+        with output.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.stdout.write(self.style.SUCCESS(f"Результат записан в {output}"))
@@ -0,0 +1,63 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from core.scoring import score_batch
+from core.services import calc_fire_activity_score, calc_simple_fire_risk, calc_total_risk, risk_color
+
+
+def _scalar_total(temp, humidity, wind, count, confidence):
+    weather = calc_simple_fire_risk(temp, humidity, wind)
+    fire = calc_fire_activity_score(count, confidence) if count is not None else 0
+    return calc_total_risk(weather, fire)
+
+
+def _none(value):
+    return None if np.isnan(value) else float(value)
+
+
+class Command(BaseCommand):
+    help = "Замеряет пакетный расчёт риска (NumPy) против построчного и проверяет совпадение результатов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Размер пакета.")
+        parser.add_argument("--scalar-rows", type=int, default=100_000, help="Сколько строк считать построчно.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        rng = np.random.default_rng(options["seed"])
+
+        temp = np.round(rng.uniform(-40, 45, rows))
+        humidity = rng.integers(0, 101, rows).astype(np.float64)
+        wind = np.round(rng.uniform(0, 30, rows), 1)
+        count = rng.integers(0, 300, rows).astype(np.float64)
+        confidence = rng.uniform(0, 100, rows)
+
+        for column, share in ((temp, 0.05), (humidity, 0.05), (wind, 0.05), (count, 0.2), (confidence, 0.3)):
+            column[rng.random(rows) < share] = np.nan
+
+        started = time.perf_counter()
+        result = score_batch(temp, humidity, wind, count, confidence)
+        batch_seconds = time.perf_counter() - started
+
+        n = min(options["scalar_rows"], rows)
+        started = time.perf_counter()
+        expected = [
+            _scalar_total(_none(temp[i]), _none(humidity[i]), _none(wind[i]), _none(count[i]), _none(confidence[i]))
+            for i in range(n)
+        ]
+        scalar_seconds = time.perf_counter() - started
+
+        self.stdout.write(f"NumPy: {rows} строк за {batch_seconds:.3f} с ({rows / batch_seconds:,.0f} строк/с)")
+        self.stdout.write(f"Построчно: {n} строк за {scalar_seconds:.3f} с ({n / scalar_seconds:,.0f} строк/с)")
+        self.stdout.write(f"Ускорение: x{(rows / batch_seconds) / (n / scalar_seconds):.0f}")
+
+        totals = result.total[:n].tolist()
+        mismatches = sum(1 for got, want in zip(totals, expected) if got != want)
+        mismatches += sum(1 for got, want in zip(result.colors[:n].tolist(), expected) if got != risk_color(want))
+        if mismatches:
+            raise CommandError(f"Пакетный расчёт расходится с построчным в {mismatches} строках")
+
+        self.stdout.write(self.style.SUCCESS(f"Результаты совпадают на {n} строках"))
@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+
+from core.models import FavoriteCity, RiskReport, WeatherSearch
+from core.rollups import record_search
+from core.signals import instrument_connection, invalidate_user_pages
+
+PROFILES = ("default", "production")
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает конкурентную запись поисков (record_search) в SQLite без настроек и с профилем production "
+        "(WAL, synchronous, busy_timeout, IMMEDIATE-транзакции). Каждый профиль — отдельный процесс и временная база. "
+        "Измеряется только работа с базой: сброс кеша страниц и метрики SQL отключены."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8, help="Одновременных пишущих потоков.")
+        parser.add_argument("--writes", type=int, default=200, help="Поисков на поток.")
+        parser.add_argument("--profiles", default=",".join(PROFILES))
+        parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+
+    def _worker(self, options) -> Dict[str, Any]:
+        if connection.vendor != "sqlite":
+            raise CommandError("Замер рассчитан на SQLite")
+
+        connection_created.disconnect(instrument_connection)
+        for signal in (post_save, post_delete):
+            for model in (WeatherSearch, FavoriteCity, RiskReport):
+                signal.disconnect(invalidate_user_pages, sender=model)
+
+        call_command("migrate", verbosity=0, interactive=False)
+        User = get_user_model()
+        users = [User.objects.create_user(username=f"bench-writer-{i}") for i in range(options["threads"])]
+
+        latencies: List[float] = []
+        locked = 0
+        lock = threading.Lock()
+
+        def writer(user):
+            nonlocal locked
+            done: List[float] = []
+            errors = 0
+            try:
+                for i in range(options["writes"]):
+                    started = time.perf_counter()
+                    try:
+                        record_search(
+                            user=user,
+                            city=f"Город-{i % 20}",
+                            is_success=True,
+                            temperature_c=20 + i % 10,
+                            humidity=40,
+                            wind_speed=3.0,
+                            lat=55.75,
+                            lon=37.62,
+                            risk_score=i % 100,
+                        )
+                    except OperationalError as exc:
+                        if "locked" not in str(exc):
+                            raise
+                        errors += 1
+                        continue
+                    done.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+            with lock:
+                latencies.extend(done)
+                locked += errors
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            list(pool.map(writer, users))
+        wall = time.perf_counter() - started
+
+        return {
+            "journal_mode": self._journal_mode(),
+            "writes": len(latencies),
+            "locked": locked,
+            "wps": round(len(latencies) / wall, 1) if wall else 0.0,
+            "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(_percentile(latencies, 99) * 1000, 1),
+        }
+
+    def _journal_mode(self) -> str:
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            return cursor.fetchone()[0]
+
+    def _spawn(self, profile: str, path: Path, options) -> Dict[str, Any]:
+        env = dict(os.environ, SQLITE_PROFILE=profile, SQLITE_PATH=str(path))
+        out = subprocess.run(
+            [
+                sys.executable,
+                str(Path(settings.BASE_DIR) / "manage.py"),
+                "bench_sqlite_writes",
+                "--worker",
+                f"--threads={options['threads']}",
+                f"--writes={options['writes']}",
+            ],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if out.returncode != 0:
+            raise CommandError(f"Профиль {profile}: {out.stderr.strip()}")
+        return json.loads(out.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        if options["worker"]:
+            self.stdout.write(json.dumps(self._worker(options)))
+            return
+
+        profiles = [p.strip() for p in options["profiles"].split(",") if p.strip()]
+        unknown = set(profiles) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Неизвестные профили: {', '.join(sorted(unknown))}")
+
+        results: Dict[str, Dict[str, Any]] = {}
+        with tempfile.TemporaryDirectory(prefix="bench-sqlite-") as tmp:
+            for profile in profiles:
+                results[profile] = r = self._spawn(profile, Path(tmp) / f"{profile}.sqlite3", options)
+                self.stdout.write(
+                    f"{profile:<11} {r['journal_mode']:<7} {r['wps']:>8} записей/с  p50 {r['p50_ms']:>7} ms  "
+                    f"p95 {r['p95_ms']:>7} ms  p99 {r['p99_ms']:>7} ms  database is locked: {r['locked']}"
+                )
+
+        if "default" in results and "production" in results and results["default"]["wps"]:
+            ratio = results["production"]["wps"] / results["default"]["wps"]
+            self.stdout.write(f"production / default по записям в секунду: {ratio:.2f}")
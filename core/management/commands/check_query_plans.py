@@ -0,0 +1,75 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.queries import hot_queries
+from core.seeding import SEED_CITIES, seed_dataset
+
+WATCHED_TABLES = (
+    "core_weathersearch",
+    "core_favoritecity",
+    "core_riskreport",
+    "core_riskreport_searches",
+    "core_usercitystats",
+)
+
+_SUBQUERY_ALIAS = re.compile(r"U\d+")
+
+_FULL_SCAN_PATTERNS = (
+    re.compile(r"\bSCAN (\w+)"),
+    re.compile(r"Seq Scan on (\w+)"),
+)
+
+
+def full_scans(plan: str):
+    found = []
+    for pattern in _FULL_SCAN_PATTERNS:
+        found += [
+            table
+            for table in pattern.findall(plan)
+            if table in WATCHED_TABLES or _SUBQUERY_ALIAS.fullmatch(table)
+        ]
+    return found
+
+
+class Command(BaseCommand):
+    help = "Заполняет БД тестовыми данными, строит планы запросов страниц (EXPLAIN) и падает при полном сканировании таблиц."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--searches", type=int, default=200000, help="Сколько запросов погоды сгенерировать.")
+        parser.add_argument("--users", type=int, default=50, help="Сколько пользователей сгенерировать.")
+        parser.add_argument("--verbose-plans", action="store_true", help="Печатать планы всех запросов.")
+
+    def handle(self, *args, **options):
+        failed = []
+
+        with transaction.atomic():
+            self.stdout.write(f"Генерация данных: {options['searches']} запросов, {options['users']} пользователей...")
+            users = seed_dataset(searches=options["searches"], users=options["users"], prefix="plancheck")
+
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+
+            user = users[0]
+            report = user.risk_reports.order_by("-day").first()
+
+            for name, qs in hot_queries(user, SEED_CITIES[0], report).items():
+                plan = qs.explain()
+                scans = full_scans(plan)
+
+                if scans:
+                    failed.append(name)
+                    self.stdout.write(self.style.ERROR(f"{name}: полное сканирование {', '.join(sorted(set(scans)))}"))
+                else:
+                    self.stdout.write(f"{name}: ok")
+
+                if scans or options["verbose_plans"]:
+                    self.stdout.write(plan)
+
+            transaction.set_rollback(True)
+
+        if failed:
+            raise CommandError(f"Запросы с полным сканированием: {', '.join(failed)}")
+
+        self.stdout.write(self.style.SUCCESS("Все запросы используют индексы"))
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.search_queue import flush_search_queue, queue_length
+
+
+class Command(BaseCommand):
+    help = (
+        "Переносит поиски из локального журнала (SEARCH_WRITE_MODE=queue) в базу пакетами. "
+        "Запись повторяется до подтверждения, дубликаты отсекаются по ключу идемпотентности."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Разобрать журнал до конца и выйти (для cron).")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=float(getattr(settings, "SEARCH_QUEUE_FLUSH_INTERVAL", 1)),
+            help="Пауза, когда журнал пуст, сек.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=int(getattr(settings, "SEARCH_QUEUE_BATCH", 500)),
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            flushed = flush_search_queue(batch_size=max(1, options["batch_size"]))
+            if flushed:
+                self.stdout.write(f"Записано из журнала: {flushed}, осталось: {queue_length()}")
+                continue
+
+            if options["once"]:
+                self.stdout.write(self.style.SUCCESS("Журнал пуст"))
+                return
+            time.sleep(max(0.1, options["interval"]))
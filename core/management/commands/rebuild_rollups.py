@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.rollups import rebuild_favorite_pointers, rebuild_risk_reports, rebuild_user_rollups
+
+
+class Command(BaseCommand):
+    help = "Проверяет или пересобирает накопительные агрегаты (дневные отчёты риска, статистику пользователей и последние запросы избранных городов)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Только проверить и завершиться с ошибкой при расхождениях.",
+        )
+
+    def handle(self, *args, **options):
+        fix = not options["check"]
+
+        reports = rebuild_risk_reports(fix=fix)
+        users = rebuild_user_rollups(fix=fix)
+        favorites = rebuild_favorite_pointers(fix=fix)
+
+        self.stdout.write(f"Отчёты с расхождениями: {len(reports)}")
+        self.stdout.write(f"Статистика пользователей с расхождениями: {len(users)}")
+        self.stdout.write(f"Избранные города с устаревшим последним запросом: {len(favorites)}")
+
+        if not fix and (reports or users or favorites):
+            raise CommandError("Агрегаты не совпадают с историей запросов. Запустите rebuild_rollups без --check.")
+
+        self.stdout.write(self.style.SUCCESS("Готово" if fix else "Расхождений нет"))
@@ -0,0 +1,178 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Set, Tuple
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Max, Min
+
+from core.models import RiskReport, WeatherSearch
+from core.checks import cache_is_process_local
+from core.page_cache import bump_user_page_version
+from core.rollups import rebuild_risk_reports
+from core.scoring import as_column, score_batch
+
+_FIELDS = ("id", "user_id", "temperature_c", "humidity", "wind_speed", "firms_count", "firms_avg_confidence", "risk_score")
+
+
+def _init_worker():
+    django.setup()
+    connections.close_all()
+
+
+def recompute_chunk(lo: int, hi: int, dry_run: bool = False) -> Tuple[int, int, List[int], List[int]]:
+    rows = list(
+        WeatherSearch.objects.filter(pk__gte=lo, pk__lt=hi, is_success=True, risk_score__isnull=False)
+        .only(*_FIELDS)
+        .order_by("pk")
+    )
+    if not rows:
+        return 0, 0, [], []
+
+    scores = score_batch(
+        as_column(r.temperature_c for r in rows),
+        as_column(r.humidity for r in rows),
+        as_column(r.wind_speed for r in rows),
+        as_column(r.firms_count for r in rows),
+        as_column(r.firms_avg_confidence for r in rows),
+    ).total.tolist()
+
+    changed = []
+    for row, score in zip(rows, scores):
+        if row.risk_score != score:
+            row.risk_score = score
+            changed.append(row)
+
+    if not changed or dry_run:
+        return len(rows), len(changed), [], []
+
+    with transaction.atomic():
+        WeatherSearch.objects.bulk_update(changed, ["risk_score"], batch_size=1000)
+
+    report_ids = list(
+        RiskReport.searches.through.objects.filter(weathersearch_id__in=[r.id for r in changed])
+        .values_list("riskreport_id", flat=True)
+        .distinct()
+    )
+    user_ids = list({r.user_id for r in changed if r.user_id is not None})
+    return len(rows), len(changed), report_ids, user_ids
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает сохранённые risk_score запросов погоды по текущей формуле порциями по первичному ключу "
+        "и пересобирает затронутые дневные отчёты."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Диапазон первичных ключей на порцию.")
+        parser.add_argument("--workers", type=int, default=1, help="Число процессов (на SQLite разумно 1).")
+        parser.add_argument(
+            "--checkpoint",
+            default="recompute_risk_scores.checkpoint.json",
+            help="Файл контрольной точки для продолжения после прерывания.",
+        )
+        parser.add_argument("--resume", action="store_true", help="Продолжить с сохранённой контрольной точки.")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Только посчитать, сколько запросов изменится, ничего не записывая.",
+        )
+
+    def _save_checkpoint(self, path: str, next_pk: int, max_pk: int, report_ids: Set[int]) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"next_pk": next_pk, "max_pk": max_pk, "report_ids": sorted(report_ids)}, f)
+        os.replace(tmp, path)
+
+    def handle(self, *args, **options):
+        chunk_size = max(1, options["chunk_size"])
+        workers = max(1, options["workers"])
+        checkpoint = options["checkpoint"]
+        dry_run = options["dry_run"]
+
+        if not dry_run and cache_is_process_local(getattr(settings, "PAGE_CACHE_ALIAS", "default")):
+            self.stdout.write(
+                self.style.WARNING(
+                    "Кеш страниц хранится в памяти процесса: веб-воркеры покажут старые оценки до PAGE_CACHE_TTL"
+                )
+            )
+
+        bounds = WeatherSearch.objects.aggregate(lo=Min("pk"), hi=Max("pk"))
+        if bounds["lo"] is None:
+            self.stdout.write("Нет запросов для пересчёта")
+            return
+
+        start, max_pk = bounds["lo"], bounds["hi"]
+        report_ids: Set[int] = set()
+
+        if options["resume"]:
+            if not os.path.exists(checkpoint):
+                raise CommandError(f"Контрольная точка {checkpoint} не найдена")
+            with open(checkpoint, encoding="utf-8") as f:
+                state = json.load(f)
+            start = state["next_pk"]
+            report_ids.update(state["report_ids"])
+            self.stdout.write(f"Продолжение с pk={start}")
+
+        chunks = [(lo, min(lo + chunk_size, max_pk + 1)) for lo in range(start, max_pk + 1, chunk_size)]
+        user_ids: Set[int] = set()
+        scanned = updated = 0
+        started = time.perf_counter()
+
+        def done(chunk, result):
+            nonlocal scanned, updated
+            rows, changed, chunk_reports, chunk_users = result
+            scanned += rows
+            updated += changed
+            report_ids.update(chunk_reports)
+            user_ids.update(chunk_users)
+            if not dry_run:
+                self._save_checkpoint(checkpoint, chunk[1], max_pk, report_ids)
+
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"pk < {chunk[1]} из {max_pk + 1}: просмотрено {scanned}, "
+                f"{'изменится' if dry_run else 'изменено'} {updated}, "
+                f"{scanned / elapsed if elapsed else 0:,.0f} строк/с"
+            )
+
+        if workers == 1:
+            for chunk in chunks:
+                done(chunk, recompute_chunk(*chunk, dry_run))
+        else:
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                results = pool.map(
+                    recompute_chunk,
+                    [lo for lo, _ in chunks],
+                    [hi for _, hi in chunks],
+                    [dry_run] * len(chunks),
+                )
+                for chunk, result in zip(chunks, results):
+                    done(chunk, result)
+
+        if dry_run:
+            self.stdout.write(
+                self.style.SUCCESS(f"Проверка: изменится {updated} из {scanned} запросов, ничего не записано")
+            )
+            return
+
+        ids = sorted(report_ids)
+        rebuilt = []
+        for i in range(0, len(ids), 500):
+            rebuilt += rebuild_risk_reports(fix=True, report_ids=ids[i : i + 500])
+
+        for user_id in user_ids:
+            bump_user_page_version(user_id)
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово: изменено {updated} из {scanned} запросов, пересобрано отчётов: {len(rebuilt)}")
+        )
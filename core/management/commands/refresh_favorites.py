@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.snapshots import refresh_favorite_snapshots
+
+
+class Command(BaseCommand):
+    help = "Обновляет погоду и FIRMS для всех избранных городов (общие снимки для всех пользователей)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Один проход и выход (для cron).")
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=int(getattr(settings, "SNAPSHOT_REFRESH_INTERVAL", 900)),
+            help="Пауза между проходами, сек.",
+        )
+        parser.add_argument("--batch-size", type=int, default=20)
+        parser.add_argument(
+            "--per-minute",
+            type=int,
+            default=int(getattr(settings, "SNAPSHOT_CITIES_PER_MINUTE", 50)),
+            help="Не больше стольких городов в минуту (лимит внешних API).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            refreshed = refresh_favorite_snapshots(
+                batch_size=max(1, options["batch_size"]),
+                per_minute=options["per_minute"],
+                log=self.stdout.write,
+            )
+            self.stdout.write(self.style.SUCCESS(f"Проход завершён, обновлено городов: {refreshed}"))
+
+            if options["once"]:
+                return
+            time.sleep(max(1, options["interval"]))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from core.page_cache import page_cache_stats
+from core.search_queue import queue_length, write_behind_enabled
+from core.services import circuit_state, http_client_stats, upstream_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Показывает состояние предохранителей и кешей внешних API (OpenWeather, FIRMS) кеша страниц и журнала поисков."
+
+    def handle(self, *args, **options):
+        for name, cache_name in (("openweather", "weather"), ("firms", "firms")):
+            state = circuit_state(name)
+            stats = upstream_cache_stats(cache_name)
+
+            line = f"{name}: {state['state']} (запросов в окне: {state['calls']}, ошибок: {state['failures']})"
+            if state["state"] == "open":
+                self.stdout.write(self.style.ERROR(line))
+            elif state["state"] == "half-open":
+                self.stdout.write(self.style.WARNING(line))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+
+            self.stdout.write(
+                f"  кеш: hit={stats['hit']} negative_hit={stats['negative_hit']} "
+                f"stale_hit={stats['stale_hit']} miss={stats['miss']} coalesced={stats['coalesced']}"
+            )
+
+        for host, stats in http_client_stats().items():
+            requests = stats["requests"]
+            reuse = f"{100 * (1 - stats['connections'] / requests):.0f}%" if requests else "—"
+            avg = f"{stats['total_ms'] / requests:.0f} мс" if requests else "—"
+            self.stdout.write(
+                f"HTTP {host}: запросов={requests} ошибок={stats['errors']} среднее время={avg} "
+                f"новых соединений={stats['connections']} повторное использование={reuse} "
+                f"TCP={stats['connect_ms']} мс TLS={stats['tls_ms']} мс"
+            )
+
+        for page, stats in page_cache_stats().items():
+            total = stats["hit"] + stats["miss"]
+            rate = f"{100 * stats['hit'] / total:.0f}%" if total else "—"
+            self.stdout.write(f"страница {page}: hit={stats['hit']} miss={stats['miss']} hit rate={rate}")
+
+        if write_behind_enabled():
+            self.stdout.write(f"журнал поисков: {queue_length()} записей ждут переноса в базу")
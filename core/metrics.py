@@ -0,0 +1,229 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class RequestTimings:
+    started: float = field(default_factory=time.perf_counter)
+    db_queries: int = 0
+    db_time: float = 0.0
+    template_time: float = 0.0
+    upstream: List[Tuple[str, float, str]] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_query(self, elapsed: float) -> None:
+        with self.lock:
+            self.db_queries += 1
+            self.db_time += elapsed
+
+    def add_template(self, elapsed: float) -> None:
+        with self.lock:
+            self.template_time += elapsed
+
+    def add_upstream(self, name: str, elapsed: float, status: str) -> None:
+        with self.lock:
+            self.upstream.append((name, elapsed, status))
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def start_request() -> Tuple[RequestTimings, object]:
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def finish_request(token) -> None:
+    _current.reset(token)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _current.get()
+
+
+def record_query(elapsed: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add_query(elapsed)
+
+
+def record_template(elapsed: float) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add_template(elapsed)
+
+
+def record_upstream(name: str, elapsed: float, status: str) -> None:
+    timings = _current.get()
+    if timings is not None:
+        timings.add_upstream(name, elapsed, status)
+    _registry.observe_upstream(name, status, elapsed)
+
+
+def _server_timing_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_" else "-" for c in name)
+
+
+def server_timing(timings: RequestTimings, total: float) -> str:
+    parts = [
+        f'db;dur={timings.db_time * 1000:.1f};desc="{timings.db_queries} queries"',
+        f"tpl;dur={timings.template_time * 1000:.1f}",
+    ]
+    for i, (name, elapsed, status) in enumerate(timings.upstream):
+        parts.append(f'{_server_timing_name(name)}-{i};dur={elapsed * 1000:.1f};desc="{name} {status}"')
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class _Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: Dict[Tuple[str, str], _Histogram] = {}
+        self._upstream: Dict[Tuple[str, str], _Histogram] = {}
+        self._db_queries: Dict[str, int] = {}
+        self._db_time: Dict[str, float] = {}
+        self._template_time: Dict[str, float] = {}
+
+    def observe_request(self, view: str, method: str, status: int, total: float, timings: RequestTimings) -> None:
+        with self._lock:
+            self._views.setdefault((view, method), _Histogram()).observe(total)
+            self._db_queries[view] = self._db_queries.get(view, 0) + timings.db_queries
+            self._db_time[view] = self._db_time.get(view, 0.0) + timings.db_time
+            self._template_time[view] = self._template_time.get(view, 0.0) + timings.template_time
+
+    def observe_upstream(self, name: str, status: str, elapsed: float) -> None:
+        with self._lock:
+            self._upstream.setdefault((name, status), _Histogram()).observe(elapsed)
+
+    def _histogram_lines(self, metric: str, labels: str, hist: _Histogram) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, hist.counts):
+            cumulative += count
+            lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {hist.count}')
+        lines.append(f"{metric}_sum{{{labels}}} {hist.total:.6f}")
+        lines.append(f"{metric}_count{{{labels}}} {hist.count}")
+        return lines
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP firerisk_view_latency_seconds Время обработки запроса по представлениям.",
+                "# TYPE firerisk_view_latency_seconds histogram",
+            ]
+            for (view, method), hist in sorted(self._views.items()):
+                lines += self._histogram_lines(
+                    "firerisk_view_latency_seconds", f'view="{view}",method="{method}"', hist
+                )
+
+            lines += [
+                "# HELP firerisk_upstream_latency_seconds Время запросов к внешним API.",
+                "# TYPE firerisk_upstream_latency_seconds histogram",
+            ]
+            for (name, status), hist in sorted(self._upstream.items()):
+                lines += self._histogram_lines(
+                    "firerisk_upstream_latency_seconds", f'upstream="{name}",status="{status}"', hist
+                )
+
+            lines += [
+                "# HELP firerisk_db_queries_total Число SQL-запросов по представлениям.",
+                "# TYPE firerisk_db_queries_total counter",
+            ]
+            lines += [f'firerisk_db_queries_total{{view="{v}"}} {n}' for v, n in sorted(self._db_queries.items())]
+
+            lines += [
+                "# HELP firerisk_db_seconds_total Время SQL-запросов по представлениям.",
+                "# TYPE firerisk_db_seconds_total counter",
+            ]
+            lines += [f'firerisk_db_seconds_total{{view="{v}"}} {t:.6f}' for v, t in sorted(self._db_time.items())]
+
+            lines += [
+                "# HELP firerisk_template_seconds_total Время рендеринга шаблонов по представлениям.",
+                "# TYPE firerisk_template_seconds_total counter",
+            ]
+            lines += [
+                f'firerisk_template_seconds_total{{view="{v}"}} {t:.6f}' for v, t in sorted(self._template_time.items())
+            ]
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+CIRCUIT_STATES = ("closed", "open", "half-open")
+
+
+HTTP_CLIENT_METRICS = (
+    ("firerisk_http_client_requests_total", "requests", "Запросы к внешним хостам (общие для всех процессов)."),
+    ("firerisk_http_client_errors_total", "errors", "Запросы к внешним хостам, завершившиеся ошибкой."),
+    ("firerisk_http_client_seconds_total", "total_ms", "Суммарное время запросов к внешним хостам, с."),
+    ("firerisk_http_client_connections_total", "connections", "Открытые соединения с внешними хостами."),
+    ("firerisk_http_client_connect_seconds_total", "connect_ms", "Суммарное время установки TCP-соединений, с."),
+    ("firerisk_http_client_tls_seconds_total", "tls_ms", "Суммарное время TLS-рукопожатий, с."),
+)
+
+
+def render_shared_metrics(
+    circuits: Dict[str, str],
+    upstream_cache: Dict[str, Dict[str, int]],
+    pages: Dict[str, Dict[str, int]],
+    http_clients: Dict[str, Dict[str, int]],
+) -> str:
+    lines = [
+        "# HELP firerisk_circuit_state Состояние предохранителя внешнего API (общее для всех процессов).",
+        "# TYPE firerisk_circuit_state gauge",
+    ]
+    for name, current in sorted(circuits.items()):
+        lines += [
+            f'firerisk_circuit_state{{upstream="{name}",state="{state}"}} {int(state == current)}'
+            for state in CIRCUIT_STATES
+        ]
+
+    lines += [
+        "# HELP firerisk_upstream_cache_events_total Попадания и промахи кеша внешних API (общие для всех процессов).",
+        "# TYPE firerisk_upstream_cache_events_total counter",
+    ]
+    for name, events in sorted(upstream_cache.items()):
+        lines += [
+            f'firerisk_upstream_cache_events_total{{cache="{name}",event="{event}"}} {count}'
+            for event, count in events.items()
+        ]
+
+    lines += [
+        "# HELP firerisk_page_cache_events_total Попадания и промахи кеша страниц (общие для всех процессов).",
+        "# TYPE firerisk_page_cache_events_total counter",
+    ]
+    for page, events in sorted(pages.items()):
+        lines += [
+            f'firerisk_page_cache_events_total{{page="{page}",event="{event}"}} {count}'
+            for event, count in events.items()
+        ]
+
+    for metric, stat, help_text in HTTP_CLIENT_METRICS:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for host, stats in sorted(http_clients.items()):
+            value = stats[stat] / 1000 if stat.endswith("_ms") else stats[stat]
+            lines.append(f'{metric}{{host="{host}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def metrics_registry() -> MetricsRegistry:
+    return _registry
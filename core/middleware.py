@@ -0,0 +1,43 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from core.metrics import finish_request, metrics_registry, server_timing, start_request
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _finish(self, request, response, timings):
+        total = time.perf_counter() - timings.started
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name if match else None) or "unmatched"
+
+        metrics_registry().observe_request(view, request.method, response.status_code, total, timings)
+        response["Server-Timing"] = server_timing(timings, total)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        timings, token = start_request()
+        try:
+            response = self.get_response(request)
+            return self._finish(request, response, timings)
+        finally:
+            finish_request(token)
+
+    async def __acall__(self, request):
+        timings, token = start_request()
+        try:
+            response = await self.get_response(request)
+            return self._finish(request, response, timings)
+        finally:
+            finish_request(token)
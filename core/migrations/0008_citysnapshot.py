@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_remove_city_add_riskreport'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CitySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city_key', models.CharField(max_length=120, unique=True)),
+                ('city', models.CharField(max_length=120)),
+                ('refreshed_at', models.DateTimeField(db_index=True)),
+                ('country', models.CharField(blank=True, max_length=8)),
+                ('temp', models.FloatField()),
+                ('feels_like', models.FloatField()),
+                ('description', models.CharField(blank=True, max_length=120)),
+                ('humidity', models.IntegerField()),
+                ('wind_speed', models.FloatField()),
+                ('icon_url', models.CharField(blank=True, max_length=200)),
+                ('lat', models.FloatField()),
+                ('lon', models.FloatField()),
+                ('risk_score', models.IntegerField()),
+                ('firms_count', models.IntegerField(blank=True, null=True)),
+                ('firms_avg_confidence', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['city'],
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_rollups(apps, schema_editor):
+    WeatherSearch = apps.get_model("core", "WeatherSearch")
+    UserSearchStats = apps.get_model("core", "UserSearchStats")
+    UserCityStats = apps.get_model("core", "UserCityStats")
+
+    totals = {}
+    cities = {}
+
+    rows = (
+        WeatherSearch.objects.filter(user__isnull=False)
+        .order_by("created_at", "id")
+        .values_list("id", "user_id", "city", "is_success", "temperature_c")
+    )
+    for search_id, user_id, city, is_success, temperature_c in rows.iterator(chunk_size=2000):
+        stats = totals.setdefault(user_id, [0, 0, 0])
+        stats[0] += 1
+        stats[1 if is_success else 2] += 1
+
+        if not is_success:
+            continue
+
+        key = " ".join((city or "").split()).casefold()
+        item = cities.setdefault((user_id, key), {"success_count": 0, "temp_sum": 0.0, "temp_count": 0})
+        item["city"] = city
+        item["last_search_id"] = search_id
+        item["success_count"] += 1
+        if temperature_c is not None:
+            item["temp_sum"] += temperature_c
+            item["temp_count"] += 1
+
+    UserSearchStats.objects.bulk_create(
+        [
+            UserSearchStats(user_id=user_id, total=total, success=success, errors=errors)
+            for user_id, (total, success, errors) in totals.items()
+        ],
+        batch_size=500,
+    )
+    UserCityStats.objects.bulk_create(
+        [UserCityStats(user_id=user_id, city_key=key, **item) for (user_id, key), item in cities.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0008_citysnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserSearchStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.IntegerField(default=0)),
+                ('success', models.IntegerField(default=0)),
+                ('errors', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserCityStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('city_key', models.CharField(max_length=120)),
+                ('city', models.CharField(max_length=120)),
+                ('success_count', models.IntegerField(default=0)),
+                ('temp_sum', models.FloatField(default=0)),
+                ('temp_count', models.IntegerField(default=0)),
+                ('last_search', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.weathersearch')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='city_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['city'],
+                'unique_together': {('user', 'city_key')},
+            },
+        ),
+        migrations.RunPython(fill_rollups, migrations.RunPython.noop),
+    ]
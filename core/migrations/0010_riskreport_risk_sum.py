@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def fill_risk_sum(apps, schema_editor):
+    RiskReport = apps.get_model("core", "RiskReport")
+    Through = RiskReport.searches.through
+
+    rows = (
+        Through.objects.filter(weathersearch__risk_score__isnull=False)
+        .values("riskreport_id")
+        .annotate(total=Sum("weathersearch__risk_score"), cnt=Count("id"), top=Max("weathersearch__risk_score"))
+    )
+    for row in rows.iterator():
+        cnt = row["cnt"]
+        RiskReport.objects.filter(pk=row["riskreport_id"]).update(
+            risk_sum=row["total"],
+            searches_count=cnt,
+            max_risk=row["top"],
+            avg_risk=round(row["total"] / cnt),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_user_stats_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='riskreport',
+            name='risk_sum',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_risk_sum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_riskreport_risk_sum'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='weathersearch',
+            options={},
+        ),
+        migrations.AlterField(
+            model_name='weathersearch',
+            name='user',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='weather_searches', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='weathersearch',
+            index=models.Index(fields=['user', '-created_at'], name='ws_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weathersearch',
+            index=models.Index(fields=['user', 'is_success', '-created_at'], name='ws_user_success_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weathersearch',
+            index=models.Index(condition=models.Q(('is_success', True)), fields=['user', 'city', '-created_at'], name='ws_user_city_success_idx'),
+        ),
+    ]
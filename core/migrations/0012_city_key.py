@@ -0,0 +1,59 @@
+from django.db import migrations, models
+
+
+def _normalize(city):
+    return " ".join((city or "").split()).casefold()
+
+
+def fill_city_keys(apps, schema_editor):
+    WeatherSearch = apps.get_model("core", "WeatherSearch")
+    FavoriteCity = apps.get_model("core", "FavoriteCity")
+
+    for city in WeatherSearch.objects.values_list("city", flat=True).distinct().iterator():
+        WeatherSearch.objects.filter(city=city).update(city_key=_normalize(city))
+
+    seen = set()
+    duplicates = []
+    for fav_id, user_id, city in FavoriteCity.objects.order_by("created_at", "id").values_list("id", "user_id", "city"):
+        key = (user_id, _normalize(city))
+        if key in seen:
+            duplicates.append(fav_id)
+            continue
+        seen.add(key)
+        FavoriteCity.objects.filter(pk=fav_id).update(city_key=key[1])
+
+    FavoriteCity.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_weathersearch_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='weathersearch',
+            name='city_key',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='favoritecity',
+            name='city_key',
+            field=models.CharField(default='', max_length=120),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_city_keys, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='favoritecity',
+            unique_together={('user', 'city_key')},
+        ),
+        migrations.RemoveIndex(
+            model_name='weathersearch',
+            name='ws_user_city_success_idx',
+        ),
+        migrations.AddIndex(
+            model_name='weathersearch',
+            index=models.Index(condition=models.Q(('is_success', True)), fields=['user', 'city_key', '-created_at'], name='ws_user_citykey_success_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_latest_search(apps, schema_editor):
+    WeatherSearch = apps.get_model("core", "WeatherSearch")
+    FavoriteCity = apps.get_model("core", "FavoriteCity")
+
+    latest = (
+        WeatherSearch.objects.filter(user=OuterRef("user"), is_success=True, city_key=OuterRef("city_key"))
+        .order_by("-created_at", "-id")
+        .values("id")[:1]
+    )
+    FavoriteCity.objects.update(latest_search=Subquery(latest))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_city_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favoritecity',
+            name='latest_search',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.weathersearch'),
+        ),
+        migrations.RunPython(fill_latest_search, migrations.RunPython.noop),
+    ]
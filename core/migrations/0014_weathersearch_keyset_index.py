@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_favoritecity_latest_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='weathersearch',
+            name='ws_user_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='weathersearch',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='ws_user_created_id_idx'),
+        ),
+    ]
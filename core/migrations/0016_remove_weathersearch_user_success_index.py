@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_weathersearch_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='weathersearch',
+            name='ws_user_success_created_idx',
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+def round_avg_risk_half_even(apps, schema_editor):
+    RiskReport = apps.get_model("core", "RiskReport")
+
+    reports = RiskReport.objects.filter(searches_count__gt=0).only("id", "risk_sum", "searches_count", "avg_risk")
+    for report in reports.iterator(chunk_size=2000):
+        expected = round(report.risk_sum / report.searches_count)
+        if report.avg_risk != expected:
+            RiskReport.objects.filter(pk=report.pk).update(avg_risk=expected)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_remove_weathersearch_user_success_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(round_avg_risk_half_even, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,9 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from core.services import normalize_city
 
 
 class WeatherSearch(models.Model):
@@ -9,9 +13,12 @@ class WeatherSearch(models.Model):
         null=True,
         blank=True,
         related_name="weather_searches",
+        db_index=False,
     )
     city = models.CharField(max_length=120)
-    created_at = models.DateTimeField(auto_now_add=True)
+    city_key = models.CharField(max_length=120, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    idempotency_key = models.CharField(max_length=32, null=True, blank=True, unique=True, editable=False)
 
     is_success = models.BooleanField(default=False)
     error_message = models.CharField(max_length=255, blank=True)
@@ -29,7 +36,18 @@ class WeatherSearch(models.Model):
     firms_avg_confidence = models.FloatField(null=True, blank=True)
 
     class Meta:
-        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at", "-id"], name="ws_user_created_id_idx"),
+            models.Index(
+                fields=["user", "city_key", "-created_at"],
+                condition=Q(is_success=True),
+                name="ws_user_citykey_success_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.city_key = normalize_city(self.city)
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         status = "OK" if self.is_success else "ERR"
@@ -43,12 +61,25 @@ class FavoriteCity(models.Model):
         related_name="favorite_cities",
     )
     city = models.CharField(max_length=120)
+    city_key = models.CharField(max_length=120)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    latest_search = models.ForeignKey(
+        WeatherSearch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
     class Meta:
-        unique_together = ("user", "city")
+        unique_together = ("user", "city_key")
         ordering = ["city"]
 
+    def save(self, *args, **kwargs):
+        self.city_key = normalize_city(self.city)
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"{self.user} — {self.city}"
 
@@ -71,6 +102,7 @@ class RiskReport(models.Model):
     avg_risk = models.IntegerField(null=True, blank=True)
     max_risk = models.IntegerField(null=True, blank=True)
     searches_count = models.IntegerField(default=0)
+    risk_sum = models.IntegerField(default=0)
 
     class Meta:
         unique_together = ("user", "day")
@@ -78,3 +110,77 @@ class RiskReport(models.Model):
 
     def __str__(self) -> str:
         return f"{self.user} — {self.day}"
+
+
+class CitySnapshot(models.Model):
+    city_key = models.CharField(max_length=120, unique=True)
+    city = models.CharField(max_length=120)
+    refreshed_at = models.DateTimeField(db_index=True)
+
+    country = models.CharField(max_length=8, blank=True)
+    temp = models.FloatField()
+    feels_like = models.FloatField()
+    description = models.CharField(max_length=120, blank=True)
+    humidity = models.IntegerField()
+    wind_speed = models.FloatField()
+    icon_url = models.CharField(max_length=200, blank=True)
+    lat = models.FloatField()
+    lon = models.FloatField()
+
+    risk_score = models.IntegerField()
+    firms_count = models.IntegerField(null=True, blank=True)
+    firms_avg_confidence = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["city"]
+
+    def __str__(self) -> str:
+        return f"{self.city} ({self.refreshed_at:%d.%m.%Y %H:%M})"
+
+
+class UserSearchStats(models.Model):
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_stats",
+    )
+    total = models.IntegerField(default=0)
+    success = models.IntegerField(default=0)
+    errors = models.IntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.user} — {self.total}"
+
+
+class UserCityStats(models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="city_stats",
+    )
+    city_key = models.CharField(max_length=120)
+    city = models.CharField(max_length=120)
+
+    success_count = models.IntegerField(default=0)
+    temp_sum = models.FloatField(default=0)
+    temp_count = models.IntegerField(default=0)
+
+    last_search = models.ForeignKey(
+        WeatherSearch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+
+    class Meta:
+        unique_together = ("user", "city_key")
+        ordering = ["city"]
+
+    @property
+    def avg_temp(self):
+        return (self.temp_sum / self.temp_count) if self.temp_count else None
+
+    def __str__(self) -> str:
+        return f"{self.user} — {self.city}"
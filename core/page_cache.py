@@ -0,0 +1,74 @@
+import hashlib
+import time
+from typing import Any, Callable, Dict, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+
+PAGES = ("profile", "stats", "reports", "risk_map")
+
+
+def _page_cache():
+    return caches[getattr(settings, "PAGE_CACHE_ALIAS", "default")]
+
+
+def _state_cache():
+    return caches[getattr(settings, "STATE_CACHE_ALIAS", "default")]
+
+
+def _version_key(user_id: int) -> str:
+    return f"page:version:{user_id}"
+
+
+def user_page_version(user_id: int) -> int:
+    cache = _state_cache()
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_user_page_version(user_id: int) -> None:
+    cache = _state_cache()
+    try:
+        cache.incr(_version_key(user_id))
+    except ValueError:
+        cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def _count_page_event(page: str, event: str) -> None:
+    cache = _state_cache()
+    key = f"page:stats:{page}:{event}"
+    cache.add(key, 0, None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def page_cache_stats(pages: Iterable[str] = PAGES) -> Dict[str, Dict[str, int]]:
+    cache = _state_cache()
+    stats = {}
+    for page in pages:
+        values = cache.get_many([f"page:stats:{page}:hit", f"page:stats:{page}:miss"])
+        stats[page] = {e: int(values.get(f"page:stats:{page}:{e}") or 0) for e in ("hit", "miss")}
+    return stats
+
+
+def cached_page_context(page: str, user_id: int, build: Callable[[], Dict[str, Any]], *parts: str) -> Dict[str, Any]:
+    cache = _page_cache()
+    key = f"page:{page}:{user_id}:{user_page_version(user_id)}"
+    if parts:
+        key += ":" + hashlib.sha1("\x1f".join(parts).encode()).hexdigest()
+
+    context = cache.get(key)
+    if context is not None:
+        _count_page_event(page, "hit")
+        return context
+
+    _count_page_event(page, "miss")
+    context = build()
+    cache.set(key, context, int(getattr(settings, "PAGE_CACHE_TTL", 600)))
+    return context
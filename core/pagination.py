@@ -0,0 +1,63 @@
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from django.db.models import Q, QuerySet
+
+PAGE_SIZE = 50
+
+
+@dataclass(frozen=True)
+class KeysetPage:
+    items: List
+    next_cursor: Optional[str]
+    prev_cursor: Optional[str]
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[datetime, int]]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split("|")
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def older_than(qs: QuerySet, created_at: datetime, pk: int) -> QuerySet:
+    return qs.filter(Q(created_at__lte=created_at), Q(created_at__lt=created_at) | Q(id__lt=pk))
+
+
+def newer_than(qs: QuerySet, created_at: datetime, pk: int) -> QuerySet:
+    return qs.filter(Q(created_at__gte=created_at), Q(created_at__gt=created_at) | Q(id__gt=pk))
+
+
+def keyset_page(qs: QuerySet, *, after: str = "", before: str = "", size: int = PAGE_SIZE) -> KeysetPage:
+    before_key = decode_cursor(before) if before else None
+    after_key = decode_cursor(after) if after else None
+
+    if before_key is not None:
+        rows = list(newer_than(qs, *before_key).order_by("created_at", "id")[: size + 1])
+        has_more = len(rows) > size
+        items = list(reversed(rows[:size]))
+        return KeysetPage(
+            items=items,
+            next_cursor=encode_cursor(items[-1].created_at, items[-1].id) if items else None,
+            prev_cursor=encode_cursor(items[0].created_at, items[0].id) if has_more else None,
+        )
+
+    if after_key is not None:
+        qs = older_than(qs, *after_key)
+
+    rows = list(qs.order_by("-created_at", "-id")[: size + 1])
+    items = rows[:size]
+    return KeysetPage(
+        items=items,
+        next_cursor=encode_cursor(items[-1].created_at, items[-1].id) if len(rows) > size else None,
+        prev_cursor=encode_cursor(items[0].created_at, items[0].id) if after_key and items else None,
+    )
@@ -0,0 +1,68 @@
+from typing import Dict
+
+from django.db.models import F, QuerySet
+
+from core.models import FavoriteCity, RiskReport, UserCityStats, WeatherSearch
+from core.pagination import newer_than, older_than
+from core.services import normalize_city
+
+
+def user_searches(user) -> QuerySet:
+    return WeatherSearch.objects.filter(user=user).order_by("-created_at", "-id")
+
+
+def city_temperature_history(user, city: str) -> QuerySet:
+    return WeatherSearch.objects.filter(
+        user=user,
+        is_success=True,
+        temperature_c__isnull=False,
+        city_key=normalize_city(city),
+    ).order_by("-created_at")
+
+
+def favorites_with_last_search(user) -> QuerySet:
+    return (
+        FavoriteCity.objects.filter(user=user)
+        .annotate(
+            last_time=F("latest_search__created_at"),
+            last_temp=F("latest_search__temperature_c"),
+            last_risk=F("latest_search__risk_score"),
+            last_firms_count=F("latest_search__firms_count"),
+            last_firms_conf=F("latest_search__firms_avg_confidence"),
+        )
+        .order_by("city")
+    )
+
+
+def favorite_lookup(user, city: str) -> QuerySet:
+    return FavoriteCity.objects.filter(user=user, city_key=normalize_city(city))
+
+
+def user_city_stats(user) -> QuerySet:
+    return UserCityStats.objects.filter(user=user).select_related("last_search").order_by("city")
+
+
+def user_reports(user) -> QuerySet:
+    return RiskReport.objects.filter(user=user).order_by("-day", "-created_at")
+
+
+def report_searches(report) -> QuerySet:
+    return report.searches.all().order_by("-created_at", "-id")
+
+
+def hot_queries(user, city: str, report) -> Dict[str, QuerySet]:
+    middle = user_searches(user)[25:26].get()
+    return {
+        "history": user_searches(user)[:51],
+        "history_older_page": older_than(user_searches(user), middle.created_at, middle.id)[:51],
+        "history_newer_page": newer_than(user_searches(user), middle.created_at, middle.id).order_by(
+            "created_at", "id"
+        )[:51],
+        "profile_last_searches": user_searches(user)[:5],
+        "stats_chart": city_temperature_history(user, city)[:50],
+        "stats_city_stats": user_city_stats(user),
+        "favorites": favorites_with_last_search(user),
+        "favorite_lookup": favorite_lookup(user, city),
+        "reports": user_reports(user)[:60],
+        "report_detail": report_searches(report)[:51],
+    }
@@ -0,0 +1,152 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+
+from core.models import UserCityStats
+from core.scoring import as_column, risk_colors, weather_risk_scores
+from core.services import risk_color
+
+BBox = Tuple[float, float, float, float]
+
+
+def _clamp(value: float, limit: float) -> float:
+    return max(-limit, min(value, limit))
+
+
+def parse_bbox(value: str) -> Optional[BBox]:
+    try:
+        parts = [float(part) for part in value.split(",")]
+        min_lon, min_lat, max_lon, max_lat = parts
+    except ValueError:
+        return None
+    if not all(math.isfinite(part) for part in parts):
+        return None
+
+    bbox = (
+        _clamp(math.floor(min_lon * 100) / 100, 180.0),
+        _clamp(math.floor(min_lat * 100) / 100, 90.0),
+        _clamp(math.ceil(max_lon * 100) / 100, 180.0),
+        _clamp(math.ceil(max_lat * 100) / 100, 90.0),
+    )
+    if bbox[0] > bbox[2] or bbox[1] > bbox[3]:
+        return None
+    return bbox
+
+
+def parse_zoom(value: str) -> int:
+    try:
+        return max(0, min(int(value), 18))
+    except (TypeError, ValueError):
+        return 0
+
+
+def map_points(user, bbox: Optional[BBox] = None) -> List[Dict[str, Any]]:
+    qs = UserCityStats.objects.filter(
+        user=user,
+        last_search__lat__isnull=False,
+        last_search__lon__isnull=False,
+    ).select_related("last_search")
+
+    if bbox is not None:
+        min_lon, min_lat, max_lon, max_lat = bbox
+        qs = qs.filter(
+            last_search__lon__range=(min_lon, max_lon),
+            last_search__lat__range=(min_lat, max_lat),
+        )
+
+    searches = [row.last_search for row in qs.order_by("-last_search__created_at")]
+    if not searches:
+        return []
+
+    fallback = weather_risk_scores(
+        as_column(r.temperature_c for r in searches),
+        as_column(r.humidity for r in searches),
+        as_column(r.wind_speed for r in searches),
+    )
+    stored = as_column(r.risk_score for r in searches)
+    scores = np.where(np.isnan(stored), fallback, stored).astype(np.int64)
+    colors = risk_colors(scores)
+
+    points = []
+    for r, score, color in zip(searches, scores.tolist(), colors.tolist()):
+        points.append(
+            {
+                "city": r.city,
+                "lat": float(r.lat),
+                "lon": float(r.lon),
+                "temp": r.temperature_c,
+                "humidity": r.humidity,
+                "wind": r.wind_speed,
+                "score": int(score),
+                "color": color,
+                "firms_count": r.firms_count,
+                "firms_avg_confidence": r.firms_avg_confidence,
+                "time": r.created_at.strftime("%d.%m.%Y %H:%M"),
+            }
+        )
+    return points
+
+
+def _point_feature(point: Dict[str, Any]) -> Dict[str, Any]:
+    properties = {k: v for k, v in point.items() if k not in ("lat", "lon")}
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [point["lon"], point["lat"]]},
+        "properties": properties,
+    }
+
+
+def cluster_points(points: List[Dict[str, Any]], zoom: int) -> List[Dict[str, Any]]:
+    if zoom >= int(getattr(settings, "RISK_MAP_CLUSTER_MAX_ZOOM", 9)):
+        return [_point_feature(p) for p in points]
+
+    cell = float(getattr(settings, "RISK_MAP_CLUSTER_CELL_DEG", 40)) / (2**zoom)
+    cells: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+    for point in points:
+        cells.setdefault((int(point["lon"] // cell), int(point["lat"] // cell)), []).append(point)
+
+    features = []
+    for members in cells.values():
+        if len(members) == 1:
+            features.append(_point_feature(members[0]))
+            continue
+
+        score = max(p["score"] for p in members)
+        features.append(
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [
+                        sum(p["lon"] for p in members) / len(members),
+                        sum(p["lat"] for p in members) / len(members),
+                    ],
+                },
+                "properties": {
+                    "cluster": True,
+                    "count": len(members),
+                    "score": score,
+                    "color": risk_color(score),
+                    "cities": [p["city"] for p in members[:10]],
+                },
+            }
+        )
+    return features
+
+
+def risk_map_geojson(user, bbox: Optional[BBox], zoom: int) -> Dict[str, Any]:
+    points = map_points(user, bbox)
+    collection: Dict[str, Any] = {
+        "type": "FeatureCollection",
+        "features": cluster_points(points, zoom),
+    }
+    if points:
+        collection["bbox"] = [
+            min(p["lon"] for p in points),
+            min(p["lat"] for p in points),
+            max(p["lon"] for p in points),
+            max(p["lat"] for p in points),
+        ]
+    return collection
@@ -0,0 +1,264 @@
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, IntegerField, Max, OuterRef, QuerySet, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Mod
+from django.db.models.lookups import Exact, GreaterThan
+from django.utils import timezone
+
+from core.models import FavoriteCity, RiskReport, UserCityStats, UserSearchStats, WeatherSearch
+
+
+def rounded_avg(total: int, count: int) -> Optional[int]:
+    if not count:
+        return None
+    return round(total / count)
+
+
+def rounded_avg_expression(total, count) -> Case:
+    quotient = total / count
+    twice_rest = 2 * (total - quotient * count)
+    return Case(
+        When(GreaterThan(twice_rest, count), then=quotient + 1),
+        When(Exact(twice_rest, count) & Exact(Mod(quotient, 2), 1), then=quotient + 1),
+        default=quotient,
+        output_field=IntegerField(),
+    )
+
+
+def increment_or_create(
+    model,
+    lookup: Dict[str, Any],
+    increments: Dict[str, Any],
+    values: Dict[str, Any],
+) -> None:
+    changes = {name: F(name) + amount for name, amount in increments.items()}
+    changes.update(values)
+
+    if model.objects.filter(**lookup).update(**changes):
+        return
+
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **increments, **values)
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**changes)
+
+
+def apply_search_to_rollups(ws: WeatherSearch) -> None:
+    if ws.user_id is None:
+        return
+
+    increment_or_create(
+        UserSearchStats,
+        {"user_id": ws.user_id},
+        {"total": 1, "success": int(ws.is_success), "errors": int(not ws.is_success)},
+        {},
+    )
+
+    if not ws.is_success:
+        return
+
+    has_temp = ws.temperature_c is not None
+    increment_or_create(
+        UserCityStats,
+        {"user_id": ws.user_id, "city_key": ws.city_key},
+        {
+            "success_count": 1,
+            "temp_sum": float(ws.temperature_c) if has_temp else 0.0,
+            "temp_count": int(has_temp),
+        },
+        {"city": ws.city, "last_search": ws},
+    )
+
+
+def _latest_success_search():
+    return (
+        WeatherSearch.objects.filter(user=OuterRef("user"), is_success=True, city_key=OuterRef("city_key"))
+        .order_by("-created_at", "-id")
+        .values("id")[:1]
+    )
+
+
+def attach_latest_search(favorites: QuerySet) -> None:
+    favorites.update(latest_search=Subquery(_latest_success_search()))
+
+
+def update_favorite_pointers(ws: WeatherSearch) -> None:
+    if ws.user_id is None or not ws.is_success:
+        return
+    FavoriteCity.objects.filter(user_id=ws.user_id, city_key=ws.city_key).update(latest_search=ws)
+
+
+def _daily_report_id(user_id: int, day) -> int:
+    report_id = RiskReport.objects.filter(user_id=user_id, day=day).values_list("id", flat=True).first()
+    if report_id is not None:
+        return report_id
+
+    try:
+        with transaction.atomic():
+            return RiskReport.objects.create(user_id=user_id, day=day).id
+    except IntegrityError:
+        return RiskReport.objects.values_list("id", flat=True).get(user_id=user_id, day=day)
+
+
+def update_daily_report(ws: WeatherSearch) -> None:
+    if ws.user_id is None or not ws.is_success:
+        return
+
+    report_id = _daily_report_id(ws.user_id, timezone.localdate(ws.created_at))
+    RiskReport.searches.through.objects.create(riskreport_id=report_id, weathersearch_id=ws.id)
+
+    if ws.risk_score is None:
+        return
+
+    score = int(ws.risk_score)
+    RiskReport.objects.filter(pk=report_id).update(
+        risk_sum=F("risk_sum") + score,
+        searches_count=F("searches_count") + 1,
+        max_risk=Greatest(Coalesce(F("max_risk"), Value(score)), Value(score)),
+        avg_risk=rounded_avg_expression(F("risk_sum") + score, F("searches_count") + 1),
+    )
+
+
+def record_search(**fields: Any) -> WeatherSearch:
+    with transaction.atomic():
+        ws = WeatherSearch.objects.create(**fields)
+        update_daily_report(ws)
+        apply_search_to_rollups(ws)
+        update_favorite_pointers(ws)
+    return ws
+
+
+def rebuild_risk_reports(*, fix: bool, report_ids: Optional[Iterable[int]] = None) -> List[int]:
+    through = RiskReport.searches.through
+    links = through.objects.filter(weathersearch__risk_score__isnull=False)
+    reports = RiskReport.objects.only("id", "risk_sum", "searches_count", "max_risk", "avg_risk")
+    if report_ids is not None:
+        report_ids = list(report_ids)
+        links = links.filter(riskreport_id__in=report_ids)
+        reports = reports.filter(id__in=report_ids)
+
+    actual = {
+        row["riskreport_id"]: row
+        for row in links.values("riskreport_id")
+        .annotate(
+            total=Sum("weathersearch__risk_score"),
+            cnt=Count("id"),
+            top=Max("weathersearch__risk_score"),
+        )
+    }
+
+    mismatched: List[int] = []
+    for report in reports.iterator(chunk_size=2000):
+        row = actual.get(report.id) or {"total": 0, "cnt": 0, "top": None}
+        expected = {
+            "risk_sum": int(row["total"] or 0),
+            "searches_count": int(row["cnt"]),
+            "max_risk": row["top"],
+            "avg_risk": rounded_avg(int(row["total"] or 0), int(row["cnt"])),
+        }
+        if all(getattr(report, name) == value for name, value in expected.items()):
+            continue
+
+        mismatched.append(report.id)
+        if fix:
+            RiskReport.objects.filter(pk=report.id).update(**expected)
+
+    return mismatched
+
+
+def rebuild_user_rollups(*, fix: bool, user_ids: Optional[Iterable[int]] = None) -> List[str]:
+    totals: Dict[int, List[int]] = {}
+    cities: Dict[tuple, Dict[str, Any]] = {}
+
+    searches = WeatherSearch.objects.filter(user__isnull=False)
+    user_stats = UserSearchStats.objects.all()
+    city_stats = UserCityStats.objects.all()
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        searches = searches.filter(user_id__in=user_ids)
+        user_stats = user_stats.filter(user_id__in=user_ids)
+        city_stats = city_stats.filter(user_id__in=user_ids)
+
+    rows = (
+        searches.order_by("created_at", "id")
+        .values_list("id", "user_id", "city", "city_key", "is_success", "temperature_c")
+    )
+    for search_id, user_id, city, city_key, is_success, temperature_c in rows.iterator(chunk_size=2000):
+        stats = totals.setdefault(user_id, [0, 0, 0])
+        stats[0] += 1
+        stats[1 if is_success else 2] += 1
+
+        if not is_success:
+            continue
+
+        item = cities.setdefault(
+            (user_id, city_key),
+            {"success_count": 0, "temp_sum": 0.0, "temp_count": 0},
+        )
+        item["city"] = city
+        item["last_search_id"] = search_id
+        item["success_count"] += 1
+        if temperature_c is not None:
+            item["temp_sum"] += temperature_c
+            item["temp_count"] += 1
+
+    current_totals = {
+        s.user_id: [s.total, s.success, s.errors] for s in user_stats.iterator(chunk_size=2000)
+    }
+    current_cities = {
+        (c.user_id, c.city_key): {
+            "success_count": c.success_count,
+            "temp_sum": c.temp_sum,
+            "temp_count": c.temp_count,
+            "city": c.city,
+            "last_search_id": c.last_search_id,
+        }
+        for c in city_stats.iterator(chunk_size=2000)
+    }
+
+    mismatched = [
+        f"user:{user_id}"
+        for user_id in set(totals) | set(current_totals)
+        if totals.get(user_id) != current_totals.get(user_id)
+    ]
+    mismatched += [
+        f"city:{user_id}:{key}"
+        for user_id, key in set(cities) | set(current_cities)
+        if cities.get((user_id, key)) != current_cities.get((user_id, key))
+    ]
+
+    if fix and mismatched:
+        with transaction.atomic():
+            user_stats.delete()
+            city_stats.delete()
+            UserSearchStats.objects.bulk_create(
+                [
+                    UserSearchStats(user_id=user_id, total=total, success=success, errors=errors)
+                    for user_id, (total, success, errors) in totals.items()
+                ],
+                batch_size=500,
+            )
+            UserCityStats.objects.bulk_create(
+                [UserCityStats(user_id=user_id, city_key=key, **item) for (user_id, key), item in cities.items()],
+                batch_size=500,
+            )
+
+    return mismatched
+
+
+def rebuild_favorite_pointers(*, fix: bool) -> List[int]:
+    favorites = FavoriteCity.objects.annotate(expected=Subquery(_latest_success_search()))
+    mismatched = [
+        fav_id
+        for fav_id, current, expected in favorites.values_list("id", "latest_search_id", "expected").iterator(
+            chunk_size=2000
+        )
+        if current != expected
+    ]
+
+    if fix and mismatched:
+        attach_latest_search(FavoriteCity.objects.filter(pk__in=mismatched))
+
+    return mismatched
@@ -0,0 +1,78 @@
+import math
+from dataclasses import dataclass
+
+import numpy as np
+
+_COLORS = np.array(["green", "yellow", "orange", "red"])
+_COLOR_BOUNDS = np.array([25, 50, 75])
+
+_FIRMS_COUNT_CAP = 100
+_COUNT_SCORES = np.array([math.log1p(c) / math.log1p(50) for c in range(_FIRMS_COUNT_CAP + 1)])
+
+
+@dataclass(frozen=True)
+class RiskScores:
+    weather: np.ndarray
+    fire: np.ndarray
+    total: np.ndarray
+    colors: np.ndarray
+
+
+def _column(values, default: float) -> np.ndarray:
+    column = np.asarray(values, dtype=np.float64)
+    return np.where(np.isnan(column), default, column)
+
+
+def weather_risk_scores(temp, humidity, wind_speed) -> np.ndarray:
+    t = _column(temp, 0.0)
+    h = np.trunc(_column(humidity, 50.0))
+    w = _column(wind_speed, 0.0)
+
+    t_score = np.clip((t + 10.0) / 45.0, 0.0, 1.0)
+    h_score = np.clip((100.0 - h) / 100.0, 0.0, 1.0)
+    w_score = np.clip(w / 20.0, 0.0, 1.0)
+
+    score = 100.0 * (0.45 * t_score + 0.35 * h_score + 0.20 * w_score)
+    return np.rint(np.clip(score, 0.0, 100.0)).astype(np.int64)
+
+
+def fire_activity_scores(firms_count, avg_confidence) -> np.ndarray:
+    counts = np.trunc(_column(firms_count, 0.0))
+    count_score = _COUNT_SCORES[np.clip(counts, 0, _FIRMS_COUNT_CAP).astype(np.int64)]
+
+    conf = np.asarray(avg_confidence, dtype=np.float64)
+    conf_score = np.where(np.isnan(conf), 0.5, np.clip(conf, 0.0, 100.0) / 100.0)
+
+    score = 100.0 * (0.65 * count_score + 0.35 * conf_score)
+    return np.rint(np.clip(score, 0.0, 100.0)).astype(np.int64)
+
+
+def total_risk_scores(weather_scores, fire_scores) -> np.ndarray:
+    score = 0.60 * np.asarray(weather_scores, dtype=np.float64) + 0.40 * np.asarray(fire_scores, dtype=np.float64)
+    return np.rint(np.clip(score, 0.0, 100.0)).astype(np.int64)
+
+
+def risk_colors(scores) -> np.ndarray:
+    return _COLORS[np.searchsorted(_COLOR_BOUNDS, np.asarray(scores), side="right")]
+
+
+def score_batch(temp, humidity, wind_speed, firms_count=None, avg_confidence=None) -> RiskScores:
+    weather = weather_risk_scores(temp, humidity, wind_speed)
+
+    if firms_count is None:
+        fire = np.zeros_like(weather)
+    else:
+        counts = np.asarray(firms_count, dtype=np.float64)
+        confidence = (
+            np.asarray(avg_confidence, dtype=np.float64)
+            if avg_confidence is not None
+            else np.full(counts.shape, np.nan)
+        )
+        fire = np.where(np.isnan(counts), 0, fire_activity_scores(counts, confidence))
+
+    total = total_risk_scores(weather, fire)
+    return RiskScores(weather=weather, fire=fire, total=total, colors=risk_colors(total))
+
+
+def as_column(values, dtype=np.float64) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=dtype)
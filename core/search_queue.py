@@ -0,0 +1,103 @@
+import json
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from datetime import datetime
+from typing import Any
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from core.db_routers import pin_user_to_primary
+from core.models import WeatherSearch
+from core.page_cache import bump_user_page_version
+from core.rollups import apply_search_to_rollups, record_search, update_daily_report, update_favorite_pointers
+from core.services import normalize_city
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_journal (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL
+)
+"""
+
+
+def _journal() -> sqlite3.Connection:
+    path = getattr(settings, "SEARCH_QUEUE_PATH", settings.BASE_DIR / "search_queue.sqlite3")
+    conn = sqlite3.connect(str(path), timeout=10, isolation_level=None)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = FULL")
+    conn.execute(_SCHEMA)
+    return conn
+
+
+def write_behind_enabled() -> bool:
+    return getattr(settings, "SEARCH_WRITE_MODE", "sync") == "queue"
+
+
+def enqueue_search(**fields: Any) -> str:
+    key = uuid.uuid4().hex
+    payload = dict(fields)
+    user = payload.pop("user", None)
+    if user is not None:
+        payload["user_id"] = user.pk
+    payload["created_at"] = timezone.now().isoformat()
+
+    with closing(_journal()) as conn:
+        conn.execute(
+            "INSERT INTO search_journal (key, payload, enqueued_at) VALUES (?, ?, ?)",
+            (key, json.dumps(payload, ensure_ascii=False), time.time()),
+        )
+    return key
+
+
+def log_search(**fields: Any) -> None:
+    if write_behind_enabled():
+        enqueue_search(**fields)
+    else:
+        record_search(**fields)
+
+
+def queue_length() -> int:
+    with closing(_journal()) as conn:
+        return conn.execute("SELECT COUNT(*) FROM search_journal").fetchone()[0]
+
+
+def flush_search_queue(batch_size: int = 500) -> int:
+    with closing(_journal()) as conn:
+        rows = conn.execute("SELECT key, payload FROM search_journal ORDER BY id LIMIT ?", (batch_size,)).fetchall()
+        if not rows:
+            return 0
+
+        keys = [key for key, _ in rows]
+        done = set(WeatherSearch.objects.filter(idempotency_key__in=keys).values_list("idempotency_key", flat=True))
+        pending = [(key, json.loads(payload)) for key, payload in rows if key not in done]
+
+        user_ids = {data.get("user_id") for _, data in pending} - {None}
+        live_users = set(get_user_model().objects.filter(id__in=user_ids).values_list("id", flat=True))
+
+        searches = []
+        for key, data in pending:
+            if data.get("user_id") not in live_users:
+                data["user_id"] = None
+            data["created_at"] = datetime.fromisoformat(data["created_at"])
+            searches.append(WeatherSearch(idempotency_key=key, city_key=normalize_city(data["city"]), **data))
+
+        with transaction.atomic():
+            WeatherSearch.objects.bulk_create(searches)
+            for ws in searches:
+                update_daily_report(ws)
+                apply_search_to_rollups(ws)
+                update_favorite_pointers(ws)
+
+        conn.executemany("DELETE FROM search_journal WHERE key = ?", [(key,) for key in keys])
+
+    for user_id in {ws.user_id for ws in searches} - {None}:
+        bump_user_page_version(user_id)
+        pin_user_to_primary(user_id)
+    return len(rows)
@@ -0,0 +1,108 @@
+import random
+from datetime import timedelta
+from typing import List
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from core.models import FavoriteCity, RiskReport, WeatherSearch
+from core.rollups import attach_latest_search, rebuild_risk_reports, rebuild_user_rollups
+from core.services import normalize_city
+
+SEED_CITIES = [
+    "Москва",
+    "Санкт-Петербург",
+    "Новосибирск",
+    "Екатеринбург",
+    "Казань",
+    "Красноярск",
+    "Иркутск",
+    "Чита",
+    "Якутск",
+    "Хабаровск",
+    "Владивосток",
+    "Барнаул",
+    "Томск",
+    "Омск",
+    "Тюмень",
+    "Пермь",
+    "Уфа",
+    "Самара",
+    "Волгоград",
+    "Краснодар",
+    "Ростов-на-Дону",
+    "Сочи",
+    "London",
+    "Paris",
+    "Berlin",
+]
+
+
+def seed_dataset(*, searches: int, users: int, prefix: str = "seed", seed: int = 0) -> List:
+    rng = random.Random(seed)
+    User = get_user_model()
+    password = make_password(None)
+
+    usernames = [f"{prefix}-{i}" for i in range(users)]
+    User.objects.bulk_create([User(username=name, password=password) for name in usernames], batch_size=500)
+    seeded = list(User.objects.filter(username__in=usernames).order_by("id"))
+
+    batch: List[WeatherSearch] = []
+    for i in range(searches):
+        ok = rng.random() < 0.8
+        city = rng.choice(SEED_CITIES)
+        batch.append(
+            WeatherSearch(
+                user=seeded[i % len(seeded)],
+                city=city,
+                city_key=normalize_city(city),
+                is_success=ok,
+                error_message="" if ok else "Город не найден",
+                temperature_c=rng.randint(-30, 35) if ok else None,
+                humidity=rng.randint(10, 100) if ok else None,
+                wind_speed=round(rng.uniform(0, 15), 1) if ok else None,
+                lat=round(rng.uniform(40, 70), 4) if ok else None,
+                lon=round(rng.uniform(20, 140), 4) if ok else None,
+                risk_score=rng.randint(0, 100) if ok else None,
+            )
+        )
+        if len(batch) >= 5000:
+            WeatherSearch.objects.bulk_create(batch)
+            batch = []
+    WeatherSearch.objects.bulk_create(batch)
+
+    FavoriteCity.objects.bulk_create(
+        [
+            FavoriteCity(user=user, city=city, city_key=normalize_city(city))
+            for user in seeded
+            for city in rng.sample(SEED_CITIES, 8)
+        ],
+        batch_size=500,
+    )
+
+    attach_latest_search(FavoriteCity.objects.filter(user__in=seeded))
+
+    today = timezone.localdate()
+    RiskReport.objects.bulk_create(
+        [RiskReport(user=user, day=today - timedelta(days=d)) for user in seeded for d in range(30)],
+        batch_size=500,
+    )
+    reports_by_user = {}
+    for report in RiskReport.objects.filter(user__in=seeded).only("id", "user_id"):
+        reports_by_user.setdefault(report.user_id, []).append(report.id)
+
+    through = RiskReport.searches.through
+    rows = WeatherSearch.objects.filter(user__in=seeded, is_success=True).values_list("id", "user_id")
+    links = []
+    for search_id, user_id in rows.iterator(chunk_size=5000):
+        links.append(through(riskreport_id=rng.choice(reports_by_user[user_id]), weathersearch_id=search_id))
+        if len(links) >= 5000:
+            through.objects.bulk_create(links)
+            links = []
+    through.objects.bulk_create(links)
+
+    rebuild_risk_reports(fix=True, report_ids=[pk for ids in reports_by_user.values() for pk in ids])
+    rebuild_user_rollups(fix=True, user_ids=[user.id for user in seeded])
+
+    return seeded
@@ -1,11 +1,222 @@
+import contextvars
 import csv
-import io
+import hashlib
 import math
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional, Tuple
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FuturesTimeout
+from array import array
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+from urllib.parse import urlsplit
 
 import requests
 from django.conf import settings
+from django.core.cache import caches
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from core.metrics import record_upstream
+
+_NOT_FOUND = "__not_found__"
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_http_lock = threading.Lock()
+_http_session: Optional[requests.Session] = None
+_http_host_limits: Dict[str, threading.BoundedSemaphore] = {}
+T = TypeVar("T")
+
+
+HTTP_STATS_FIELDS = ("requests", "errors", "total_ms", "connections", "connect_ms", "tls_ms")
+
+
+def _record_http(host: str, **values: float) -> None:
+    for name, value in values.items():
+        _incr_shared(f"http:{host}:{name}", int(round(value)))
+
+
+def http_client_stats() -> Dict[str, Dict[str, int]]:
+    hosts = sorted(
+        {
+            urlsplit(getattr(settings, "OPENWEATHER_BASE_URL", "")).hostname or "",
+            urlsplit(getattr(settings, "FIRMS_BASE_URL", "")).hostname or "",
+        }
+        - {""}
+    )
+    values = _state_cache().get_many([f"http:{host}:{name}" for host in hosts for name in HTTP_STATS_FIELDS])
+    return {host: {name: int(values.get(f"http:{host}:{name}") or 0) for name in HTTP_STATS_FIELDS} for host in hosts}
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def _new_conn(self):
+        started = time.perf_counter()
+        sock = super()._new_conn()
+        self._connect_time = time.perf_counter() - started
+        return sock
+
+    def connect(self):
+        started = time.perf_counter()
+        self._connect_time = 0.0
+        super().connect()
+        total = time.perf_counter() - started
+        _record_http(
+            self.host,
+            connections=1,
+            connect_ms=self._connect_time * 1000,
+            tls_ms=max(0.0, total - self._connect_time) * 1000,
+        )
+
+
+class _TimedHTTPSConnection(_TimedHTTPConnection, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class _PooledAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def _get_http_session() -> requests.Session:
+    global _http_session
+
+    with _http_lock:
+        if _http_session is None:
+            adapter = _PooledAdapter(
+                pool_connections=8,
+                pool_maxsize=int(getattr(settings, "HTTP_POOL_MAXSIZE", 10)),
+            )
+            session = requests.Session()
+            session.headers["Accept-Encoding"] = "gzip, deflate"
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _http_session = session
+        return _http_session
+
+
+def _host_limit(host: str) -> threading.BoundedSemaphore:
+    with _http_lock:
+        limit = _http_host_limits.get(host)
+        if limit is None:
+            limit = threading.BoundedSemaphore(int(getattr(settings, "HTTP_HOST_CONCURRENCY", 8)))
+            _http_host_limits[host] = limit
+        return limit
+
+
+class UpstreamUnavailable(requests.exceptions.RequestException):
+    pass
+
+
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def _retry_delay(attempt: int, deadline_at: float) -> Optional[float]:
+    if attempt >= int(getattr(settings, "HTTP_RETRIES", 2)):
+        return None
+    backoff = float(getattr(settings, "HTTP_BACKOFF", 0.3))
+    delay = backoff * (2**attempt) + random.uniform(0, backoff)
+    if time.monotonic() + delay >= deadline_at:
+        return None
+    return delay
+
+
+def _release_on_close(close: Callable[[], None], limit: threading.BoundedSemaphore) -> Callable[[], None]:
+    released = threading.Lock()
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            if released.acquire(blocking=False):
+                limit.release()
+
+    return close_and_release
+
+
+def http_get(
+    url: str,
+    *,
+    timeout: float,
+    params: Optional[Dict[str, Any]] = None,
+    upstream: Optional[str] = None,
+    stream: bool = False,
+    label: Optional[str] = None,
+    deadline: Optional[float] = None,
+) -> requests.Response:
+    host = urlsplit(url).hostname or ""
+    label = label or upstream or host
+
+    if upstream and not circuit_allows(upstream):
+        record_upstream(label, 0.0, "circuit_open")
+        raise UpstreamUnavailable(f"{upstream}: цепь разомкнута")
+
+    deadline_at = time.monotonic() + (timeout if deadline is None else deadline)
+
+    limit = _host_limit(host)
+    if not limit.acquire(timeout=max(0.0, deadline_at - time.monotonic())):
+        _record_http(host, requests=1, errors=1)
+        record_upstream(label, 0.0, "throttled")
+        raise requests.exceptions.ConnectTimeout(f"Слишком много одновременных запросов к {host}")
+
+    started = time.perf_counter()
+    attempt = 0
+    released_on_close = False
+    try:
+        while True:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise requests.exceptions.ConnectTimeout(f"Истёк срок ожидания ответа {host}")
+            try:
+                resp = _get_http_session().get(url, params=params, timeout=min(timeout, remaining), stream=stream)
+            except requests.exceptions.ConnectionError:
+                delay = _retry_delay(attempt, deadline_at)
+                if delay is None:
+                    raise
+            else:
+                if resp.status_code not in _RETRY_STATUSES:
+                    break
+                delay = _retry_delay(attempt, deadline_at)
+                if delay is None:
+                    break
+                resp.close()
+
+            time.sleep(delay)
+            attempt += 1
+        if stream:
+            resp.close = _release_on_close(resp.close, limit)
+            released_on_close = True
+    except Exception:
+        elapsed = time.perf_counter() - started
+        _record_http(host, requests=1, errors=1, total_ms=elapsed * 1000)
+        record_upstream(label, elapsed, "error")
+        if upstream:
+            circuit_record(upstream, False, elapsed)
+        raise
+    finally:
+        if not released_on_close:
+            limit.release()
+
+    elapsed = time.perf_counter() - started
+    _record_http(host, requests=1, total_ms=elapsed * 1000)
+    record_upstream(label, elapsed, str(resp.status_code))
+    if upstream:
+        circuit_record(upstream, resp.status_code < 500 and resp.status_code != 429, elapsed)
+    return resp
 
 
 @dataclass(frozen=True)
@@ -20,31 +231,180 @@ class WeatherResult:
     icon_url: str
     lat: float
     lon: float
+    city_id: Optional[int] = None
 
 
-def get_weather_by_city(city: str) -> Optional[WeatherResult]:
-    api_key = (getattr(settings, "OPENWEATHER_API_KEY", "") or "").strip()
-    if not api_key:
-        return None
+def normalize_city(city: str) -> str:
+    return " ".join((city or "").split()).casefold()
+
+
+def _upstream_cache():
+    return caches[getattr(settings, "UPSTREAM_CACHE_ALIAS", "default")]
+
+
+def _state_cache():
+    return caches[getattr(settings, "STATE_CACHE_ALIAS", "default")]
 
-    url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {"q": city, "appid": api_key, "units": "metric", "lang": "ru"}
 
+def _upstream_cache_key(*parts: Any) -> str:
+    raw = ":".join(str(p) for p in parts)
+    return "upstream:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _incr_shared(key: str, delta: int = 1) -> None:
+    cache = _state_cache()
+    cache.add(key, 0, None)
     try:
-        resp = requests.get(url, params=params, timeout=8)
-    except Exception:
-        return None
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+def _count_cache_event(name: str, event: str) -> None:
+    _incr_shared(f"upstream:stats:{name}:{event}")
 
-    if resp.status_code != 200:
-        return None
 
+def upstream_cache_stats(name: str) -> Dict[str, int]:
+    cache = _state_cache()
+    events = ("hit", "negative_hit", "stale_hit", "miss", "coalesced")
+    values = cache.get_many([f"upstream:stats:{name}:{e}" for e in events])
+    return {e: int(values.get(f"upstream:stats:{name}:{e}") or 0) for e in events}
+
+
+def _circuit_key(name: str, part: str) -> str:
+    return f"upstream:circuit:{name}:{part}"
+
+
+def circuit_allows(name: str) -> bool:
+    cache = _state_cache()
+    open_until = cache.get(_circuit_key(name, "open_until"))
+    if open_until is None:
+        return True
+    if time.time() < open_until:
+        return False
+    return cache.add(_circuit_key(name, "probe"), 1, int(getattr(settings, "CIRCUIT_OPEN_SECONDS", 30)))
+
+
+def _circuit_open(name: str) -> None:
+    cache = _state_cache()
+    cache.set(_circuit_key(name, "open_until"), time.time() + float(getattr(settings, "CIRCUIT_OPEN_SECONDS", 30)), None)
+    cache.delete(_circuit_key(name, "probe"))
+
+
+def circuit_record(name: str, ok: bool, elapsed: float) -> None:
+    cache = _state_cache()
+    failed = not ok or elapsed > float(getattr(settings, "CIRCUIT_SLOW_CALL", 5))
+
+    if cache.get(_circuit_key(name, "open_until")) is not None:
+        if failed:
+            _circuit_open(name)
+        else:
+            cache.delete_many([_circuit_key(name, "open_until"), _circuit_key(name, "probe")])
+        return
+
+    window = int(getattr(settings, "CIRCUIT_WINDOW", 60))
+    bucket = int(time.time() // window)
+    calls_key = _circuit_key(name, f"calls:{bucket}")
+    failures_key = _circuit_key(name, f"failures:{bucket}")
+
+    cache.add(calls_key, 0, window * 2)
+    cache.add(failures_key, 0, window * 2)
     try:
-        data = resp.json()
-    except Exception:
-        return None
+        calls = cache.incr(calls_key)
+        failures = cache.incr(failures_key) if failed else int(cache.get(failures_key) or 0)
+    except ValueError:
+        return
+
+    min_calls = int(getattr(settings, "CIRCUIT_MIN_CALLS", 5))
+    error_rate = float(getattr(settings, "CIRCUIT_ERROR_RATE", 0.5))
+    if calls >= min_calls and failures / calls >= error_rate:
+        _circuit_open(name)
+        cache.delete_many([calls_key, failures_key])
+
+
+def circuit_state(name: str) -> Dict[str, Any]:
+    cache = _state_cache()
+    window = int(getattr(settings, "CIRCUIT_WINDOW", 60))
+    bucket = int(time.time() // window)
+    open_until = cache.get(_circuit_key(name, "open_until"))
+
+    if open_until is None:
+        state = "closed"
+    elif time.time() < open_until:
+        state = "open"
+    else:
+        state = "half-open"
+
+    return {
+        "state": state,
+        "open_until": open_until,
+        "calls": int(cache.get(_circuit_key(name, f"calls:{bucket}")) or 0),
+        "failures": int(cache.get(_circuit_key(name, f"failures:{bucket}")) or 0),
+    }
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = threading.Lock()
+
+
+def _with_cache_lock(key: str, fn: Callable[[], T]) -> T:
+    if not getattr(settings, "SINGLE_FLIGHT_CACHE_LOCK", False):
+        return fn()
+
+    cache = _state_cache()
+    lock_key = _upstream_cache_key("flight", key)
+    timeout = float(getattr(settings, "SINGLE_FLIGHT_TIMEOUT", 30))
+    deadline = time.monotonic() + timeout
+
+    while not cache.add(lock_key, 1, int(timeout) + 1):
+        if time.monotonic() >= deadline:
+            return fn()
+        time.sleep(0.05)
+
+    try:
+        return fn()
+    finally:
+        cache.delete(lock_key)
+
+
+def single_flight(name: str, key: str, fn: Callable[[], T]) -> T:
+    flight_key = f"{name}:{key}"
+    with _flights_lock:
+        flight = _flights.get(flight_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[flight_key] = _Flight()
+
+    if not leader:
+        if flight.done.wait(float(getattr(settings, "SINGLE_FLIGHT_TIMEOUT", 30))):
+            _count_cache_event(name, "coalesced")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        return fn()
 
     try:
-        name = str(data.get("name") or city)
+        flight.result = _with_cache_lock(flight_key, fn)
+        return flight.result
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(flight_key, None)
+        flight.done.set()
+
+
+def _parse_weather(data: Dict[str, Any], fallback_name: str) -> Optional[WeatherResult]:
+    try:
+        name = str(data.get("name") or fallback_name)
         sys_data = data.get("sys") or {}
         country = str(sys_data.get("country") or "")
 
@@ -64,6 +424,7 @@ def get_weather_by_city(city: str) -> Optional[WeatherResult]:
 
         lat = float(coord.get("lat"))
         lon = float(coord.get("lon"))
+        city_id = data.get("id")
 
         return WeatherResult(
             city=name,
@@ -76,11 +437,165 @@ def get_weather_by_city(city: str) -> Optional[WeatherResult]:
             icon_url=icon_url,
             lat=lat,
             lon=lon,
+            city_id=int(city_id) if city_id else None,
         )
     except Exception:
         return None
 
 
+def _openweather_base_url() -> str:
+    return getattr(settings, "OPENWEATHER_BASE_URL", "https://api.openweathermap.org/data/2.5").rstrip("/")
+
+
+def _fetch_weather_json(url: str, params: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], bool]:
+    try:
+        resp = http_get(
+            url,
+            params=params,
+            timeout=8,
+            deadline=float(getattr(settings, "WEATHER_DEADLINE", 8)),
+            upstream="openweather",
+        )
+    except Exception:
+        return None, False
+
+    if resp.status_code == 404:
+        return None, True
+
+    if resp.status_code != 200:
+        return None, False
+
+    try:
+        return resp.json(), False
+    except Exception:
+        return None, False
+
+
+def _store_weather(city: str, result: WeatherResult) -> None:
+    cache = _upstream_cache()
+    key = normalize_city(city)
+    cache.set(_upstream_cache_key("weather", "city", key), result, int(getattr(settings, "WEATHER_CACHE_TTL", 600)))
+    cache.set(_upstream_cache_key("weather", "stale", key), result, int(getattr(settings, "UPSTREAM_STALE_TTL", 21600)))
+    if result.city_id:
+        cache.set(
+            _upstream_cache_key("weather", "id", key),
+            result.city_id,
+            int(getattr(settings, "WEATHER_CITY_ID_TTL", 2592000)),
+        )
+
+
+def get_weather_by_city(city: str) -> Optional[WeatherResult]:
+    api_key = (getattr(settings, "OPENWEATHER_API_KEY", "") or "").strip()
+    if not api_key:
+        return None
+
+    cache = _upstream_cache()
+    key = _upstream_cache_key("weather", "city", normalize_city(city))
+
+    cached = cache.get(key)
+    if cached == _NOT_FOUND:
+        _count_cache_event("weather", "negative_hit")
+        return None
+    if cached is not None:
+        _count_cache_event("weather", "hit")
+        return cached
+
+    return single_flight("weather", normalize_city(city), lambda: _load_weather(city, api_key))
+
+
+def _load_weather(city: str, api_key: str) -> Optional[WeatherResult]:
+    cache = _upstream_cache()
+    key = _upstream_cache_key("weather", "city", normalize_city(city))
+
+    cached = cache.get(key)
+    if cached is not None:
+        return None if cached == _NOT_FOUND else cached
+
+    _count_cache_event("weather", "miss")
+
+    params = {"q": city, "appid": api_key, "units": "metric", "lang": "ru"}
+    data, not_found = _fetch_weather_json(f"{_openweather_base_url()}/weather", params)
+    result = _parse_weather(data, city) if data is not None else None
+
+    if result is not None:
+        _store_weather(city, result)
+    elif not_found:
+        cache.set(key, _NOT_FOUND, int(getattr(settings, "WEATHER_CACHE_NEGATIVE_TTL", 120)))
+    else:
+        result = cache.get(_upstream_cache_key("weather", "stale", normalize_city(city)))
+        if result is not None:
+            _count_cache_event("weather", "stale_hit")
+
+    return result
+
+
+def _fetch_weather_group(api_key: str, ids: List[int]) -> Dict[int, WeatherResult]:
+    params = {"id": ",".join(str(i) for i in ids), "appid": api_key, "units": "metric", "lang": "ru"}
+    data, _ = _fetch_weather_json(f"{_openweather_base_url()}/group", params)
+
+    results: Dict[int, WeatherResult] = {}
+    for item in (data or {}).get("list") or []:
+        result = _parse_weather(item or {}, "")
+        if result is not None and result.city_id:
+            results[result.city_id] = result
+    return results
+
+
+def get_weather_by_cities(cities: Iterable[str]) -> Dict[str, Optional[WeatherResult]]:
+    names: Dict[str, str] = {}
+    for city in cities:
+        key = normalize_city(city)
+        if key and key not in names:
+            names[key] = city
+
+    results: Dict[str, Optional[WeatherResult]] = {}
+    api_key = (getattr(settings, "OPENWEATHER_API_KEY", "") or "").strip()
+    if not api_key or not names:
+        return {city: None for city in names.values()}
+
+    cache = _upstream_cache()
+    fresh = cache.get_many([_upstream_cache_key("weather", "city", key) for key in names])
+    ids = cache.get_many([_upstream_cache_key("weather", "id", key) for key in names])
+
+    by_id: Dict[int, str] = {}
+    unresolved: List[str] = []
+
+    for key, city in names.items():
+        cached = fresh.get(_upstream_cache_key("weather", "city", key))
+        if cached is not None:
+            _count_cache_event("weather", "negative_hit" if cached == _NOT_FOUND else "hit")
+            results[city] = None if cached == _NOT_FOUND else cached
+            continue
+
+        city_id = ids.get(_upstream_cache_key("weather", "id", key))
+        if city_id:
+            by_id[int(city_id)] = city
+        else:
+            unresolved.append(city)
+
+    id_list = list(by_id)
+    for start in range(0, len(id_list), 20):
+        chunk = id_list[start : start + 20]
+        fetched = _fetch_weather_group(api_key, chunk)
+        for city_id in chunk:
+            city = by_id[city_id]
+            result = fetched.get(city_id)
+            if result is None:
+                unresolved.append(city)
+                continue
+            _count_cache_event("weather", "miss")
+            _store_weather(city, result)
+            results[city] = result
+
+    if unresolved:
+        workers = max(1, min(len(unresolved), int(getattr(settings, "WEATHER_BATCH_CONCURRENCY", 4))))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="weather") as executor:
+            for city, result in zip(unresolved, executor.map(get_weather_by_city, unresolved)):
+                results[city] = result
+
+    return {city: results.get(city) for city in names.values()}
+
+
 def calc_simple_fire_risk(temp_c: Optional[float], humidity: Optional[int], wind_speed: Optional[float]) -> int:
     t = float(temp_c) if temp_c is not None else 0.0
     h = int(humidity) if humidity is not None else 50
@@ -133,6 +648,234 @@ def _looks_like_error_payload(text: str) -> bool:
     )
 
 
+_CONFIDENCE_LEVELS = {
+    "l": 15.0,
+    "low": 15.0,
+    "n": 55.0,
+    "nominal": 55.0,
+    "h": 90.0,
+    "high": 90.0,
+}
+
+
+@dataclass
+class FirmsPoints:
+    lat: array = field(default_factory=lambda: array("d"))
+    lon: array = field(default_factory=lambda: array("d"))
+    confidence: array = field(default_factory=lambda: array("d"))
+    acquired: array = field(default_factory=lambda: array("q"))
+
+    def __len__(self) -> int:
+        return len(self.lat)
+
+    def append(self, lat: float, lon: float, confidence: float, acquired: int) -> None:
+        self.lat.append(lat)
+        self.lon.append(lon)
+        self.confidence.append(confidence)
+        self.acquired.append(acquired)
+
+    def extend(self, other: "FirmsPoints") -> None:
+        self.lat.extend(other.lat)
+        self.lon.extend(other.lon)
+        self.confidence.extend(other.confidence)
+        self.acquired.extend(other.acquired)
+
+    def within(self, lat: float, lon: float, radius_km: float) -> "FirmsPoints":
+        result = FirmsPoints()
+        for i in range(len(self)):
+            if _distance_km(lat, lon, self.lat[i], self.lon[i]) <= radius_km:
+                result.append(self.lat[i], self.lon[i], self.confidence[i], self.acquired[i])
+        return result
+
+    def aggregate(self) -> Tuple[int, Optional[float]]:
+        known = [c for c in self.confidence if not math.isnan(c)]
+        avg_conf = (math.fsum(known) / len(known)) if known else None
+        return len(self), avg_conf
+
+
+def _parse_confidence(raw: str) -> float:
+    value = (raw or "").strip().lower()
+    try:
+        return float(value)
+    except ValueError:
+        return _CONFIDENCE_LEVELS.get(value, math.nan)
+
+
+def _parse_acquired(acq_date: str, acq_time: str, days_cache: Dict[str, int]) -> int:
+    days = days_cache.get(acq_date)
+    if days is None:
+        try:
+            days = date.fromisoformat(acq_date.strip()).toordinal() - _EPOCH_ORDINAL
+        except ValueError:
+            days = 0
+        days_cache[acq_date] = days
+
+    try:
+        hhmm = int((acq_time or "0").strip() or 0)
+    except ValueError:
+        hhmm = 0
+
+    return days * 86400 + (hhmm // 100) * 3600 + (hhmm % 100) * 60
+
+
+def _distance_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371.0 * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _firms_tile_size() -> float:
+    return float(getattr(settings, "FIRMS_TILE_DEG", 0.5))
+
+
+def _firms_tiles_for_bbox(west: float, south: float, east: float, north: float) -> List[Tuple[int, int]]:
+    size = _firms_tile_size()
+    max_x = math.ceil(180.0 / size) - 1
+    max_y = math.ceil(90.0 / size) - 1
+
+    x0 = max(-max_x - 1, math.floor(west / size))
+    x1 = min(max_x, math.floor(east / size))
+    y0 = max(-max_y - 1, math.floor(south / size))
+    y1 = min(max_y, math.floor(north / size))
+
+    return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+
+def _firms_tile_of(lat: float, lon: float) -> Tuple[int, int]:
+    size = _firms_tile_size()
+    return math.floor(lon / size), math.floor(lat / size)
+
+
+def _firms_tile_key(source: str, day_range: int, tile: Tuple[int, int], kind: str = "tile") -> str:
+    return _upstream_cache_key("firms", kind, source, day_range, _firms_tile_size(), tile[0], tile[1])
+
+
+def _firms_read_csv(
+    lines: Iterable[str],
+    tiles: Dict[Tuple[int, int], FirmsPoints],
+) -> Optional[str]:
+    reader = csv.reader(line for line in lines if line)
+    header = next(reader, None)
+    if header is None:
+        return None
+
+    if _looks_like_error_payload(",".join(header)):
+        return "FIRMS вернул ошибку (не CSV)"
+
+    columns = {name.strip().lower(): i for i, name in enumerate(header)}
+    if "latitude" not in columns or "longitude" not in columns:
+        return "FIRMS вернул ошибку (не CSV)"
+
+    lat_i = columns["latitude"]
+    lon_i = columns["longitude"]
+    conf_i = columns.get("confidence")
+    date_i = columns.get("acq_date")
+    time_i = columns.get("acq_time")
+    width = max(columns.values()) + 1
+    days_cache: Dict[str, int] = {}
+
+    for row in reader:
+        if len(row) < width:
+            continue
+        try:
+            lat = float(row[lat_i])
+            lon = float(row[lon_i])
+        except ValueError:
+            continue
+
+        points = tiles.get(_firms_tile_of(lat, lon))
+        if points is None:
+            continue
+
+        points.append(
+            lat,
+            lon,
+            _parse_confidence(row[conf_i]) if conf_i is not None else math.nan,
+            _parse_acquired(
+                row[date_i] if date_i is not None else "",
+                row[time_i] if time_i is not None else "",
+                days_cache,
+            ),
+        )
+
+    return None
+
+
+def _firms_download(
+    map_key: str,
+    source: str,
+    bbox: Tuple[float, float, float, float],
+    day_range: int,
+    tiles: Dict[Tuple[int, int], FirmsPoints],
+) -> Optional[str]:
+    west, south, east, north = bbox
+    area = f"{west:.6f},{south:.6f},{east:.6f},{north:.6f}"
+    base_url = getattr(settings, "FIRMS_BASE_URL", "https://firms.modaps.eosdis.nasa.gov/api/area/csv").rstrip("/")
+    url = f"{base_url}/{map_key}/{source}/{area}/{day_range}"
+
+    try:
+        resp = http_get(url, timeout=15, upstream="firms", stream=True, label=f"firms:{source}")
+    except Exception:
+        return "Не удалось подключиться к FIRMS"
+
+    try:
+        if resp.status_code != 200:
+            return f"FIRMS вернул HTTP {resp.status_code}"
+
+        resp.encoding = resp.encoding or "utf-8"
+        return _firms_read_csv(resp.iter_lines(decode_unicode=True), tiles)
+    except Exception:
+        return "Не удалось прочитать CSV от FIRMS"
+    finally:
+        resp.close()
+
+
+def _firms_load_tiles(
+    map_key: str,
+    source: str,
+    day_range: int,
+    missing: List[Tuple[int, int]],
+) -> Tuple[Dict[Tuple[int, int], FirmsPoints], Optional[str]]:
+    cache = _upstream_cache()
+    keys = {tile: _firms_tile_key(source, day_range, tile) for tile in missing}
+
+    cached = cache.get_many(list(keys.values()))
+    if len(cached) == len(keys):
+        return {tile: cached[key] for tile, key in keys.items()}, None
+
+    _count_cache_event("firms", "miss")
+
+    size = _firms_tile_size()
+    bbox = (
+        max(-180.0, min(x for x, _ in missing) * size),
+        max(-90.0, min(y for _, y in missing) * size),
+        min(180.0, (max(x for x, _ in missing) + 1) * size),
+        min(90.0, (max(y for _, y in missing) + 1) * size),
+    )
+    fetched = {tile: FirmsPoints() for tile in missing}
+    err = _firms_download(map_key, source, bbox, day_range, fetched)
+    if err is not None:
+        stale_keys = {tile: _firms_tile_key(source, day_range, tile, "stale") for tile in missing}
+        stale = cache.get_many(list(stale_keys.values()))
+        if len(stale) < len(stale_keys):
+            return {}, err
+        _count_cache_event("firms", "stale_hit")
+        return {tile: stale[key] for tile, key in stale_keys.items()}, None
+
+    cache.set_many(
+        {keys[tile]: points for tile, points in fetched.items()},
+        int(getattr(settings, "FIRMS_CACHE_TTL", 900)),
+    )
+    cache.set_many(
+        {_firms_tile_key(source, day_range, tile, "stale"): points for tile, points in fetched.items()},
+        int(getattr(settings, "UPSTREAM_STALE_TTL", 21600)),
+    )
+    return fetched, None
+
+
 def firms_get_area_events_for_source(
     *,
     lat: float,
@@ -140,7 +883,7 @@ def firms_get_area_events_for_source(
     source: str,
     radius_km: float = 50.0,
     day_range: int = 7,
-) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+) -> Tuple[Optional[FirmsPoints], Optional[str]]:
     map_key = (getattr(settings, "FIRMS_MAP_KEY", "") or "").strip()
     if not map_key:
         return None, "FIRMS_MAP_KEY не задан"
@@ -155,42 +898,43 @@ def firms_get_area_events_for_source(
     if day_range > 30:
         day_range = 30
 
-    west, south, east, north = _bbox_around_point(lat, lon, radius_km)
-    area = f"{west:.6f},{south:.6f},{east:.6f},{north:.6f}"
-    url = f"https://firms.modaps.eosdis.nasa.gov/api/area/csv/{map_key}/{source}/{area}/{day_range}"
+    tiles = _firms_tiles_for_bbox(*_bbox_around_point(lat, lon, radius_km))
+    keys = {tile: _firms_tile_key(source, day_range, tile) for tile in tiles}
 
-    try:
-        resp = requests.get(url, timeout=15)
-    except Exception:
-        return None, "Не удалось подключиться к FIRMS"
+    cache = _upstream_cache()
+    cached = cache.get_many(list(keys.values()))
+    tile_points: Dict[Tuple[int, int], FirmsPoints] = {}
+    missing: List[Tuple[int, int]] = []
 
-    if resp.status_code != 200:
-        return None, f"FIRMS вернул HTTP {resp.status_code}"
+    for tile, key in keys.items():
+        if key in cached:
+            tile_points[tile] = cached[key]
+        else:
+            missing.append(tile)
 
-    text = (resp.text or "").strip()
-    if not text:
-        return [], None
+    if not missing:
+        _count_cache_event("firms", "hit")
+    else:
+        missing.sort()
+        fetched, err = single_flight(
+            "firms",
+            f"{source}:{day_range}:{_firms_tile_size()}:{missing}",
+            lambda: _firms_load_tiles(map_key, source, day_range, missing),
+        )
+        if err is not None:
+            return None, err
+        tile_points.update(fetched)
 
-    if _looks_like_error_payload(text):
-        return None, "FIRMS вернул ошибку (не CSV)"
+    result = FirmsPoints()
+    for tile in tiles:
+        points = tile_points.get(tile)
+        if points is not None:
+            result.extend(points.within(lat, lon, radius_km))
 
-    try:
-        reader = csv.DictReader(io.StringIO(text))
-        rows: List[Dict[str, Any]] = []
-        for r in reader:
-            if isinstance(r, dict):
-                rows.append(r)
-        return rows, None
-    except Exception:
-        return None, "Не удалось прочитать CSV от FIRMS"
+    return result, None
 
 
-def firms_get_area_events(
-    lat: float,
-    lon: float,
-    radius_km: float = 50.0,
-    day_range: int = 7,
-) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str], Optional[str]]:
+def _firms_sources() -> List[str]:
     first = (getattr(settings, "FIRMS_SOURCE", "") or "").strip() or "VIIRS_SNPP_NRT"
 
     candidates = [first, "VIIRS_SNPP_NRT", "VIIRS_NOAA20_NRT", "MODIS_NRT"]
@@ -201,12 +945,34 @@ def firms_get_area_events(
         if s and s not in seen:
             seen.add(s)
             ordered.append(s)
+    return ordered
+
+
+def _firms_merge(results: List[Tuple[str, FirmsPoints]]) -> FirmsPoints:
+    seen = set()
+    merged = FirmsPoints()
+    for _, points in results:
+        for i in range(len(points)):
+            key = (round(points.lat[i], 2), round(points.lon[i], 2), points.acquired[i] // 86400)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(points.lat[i], points.lon[i], points.confidence[i], points.acquired[i])
+    return merged
 
-    best_rows: Optional[List[Dict[str, Any]]] = None
+
+def _firms_sequential(
+    sources: List[str],
+    lat: float,
+    lon: float,
+    radius_km: float,
+    day_range: int,
+) -> Tuple[Optional[FirmsPoints], Optional[str], Optional[str]]:
+    best_rows: Optional[FirmsPoints] = None
     best_source: Optional[str] = None
     last_error: Optional[str] = None
 
-    for src in ordered:
+    for src in sources:
         rows, err = firms_get_area_events_for_source(
             lat=lat,
             lon=lon,
@@ -231,20 +997,93 @@ def firms_get_area_events(
     return best_rows, best_source, None
 
 
-def firms_aggregate(rows: Optional[List[Dict[str, Any]]]) -> Tuple[int, Optional[float]]:
-    if rows is None or not rows:
-        return 0, None
+def _firms_parallel(
+    sources: List[str],
+    lat: float,
+    lon: float,
+    radius_km: float,
+    day_range: int,
+    policy: str,
+) -> Tuple[Optional[FirmsPoints], Optional[str], Optional[str]]:
+    deadline = float(getattr(settings, "FIRMS_FANOUT_DEADLINE", 20))
+    executor = ThreadPoolExecutor(max_workers=len(sources), thread_name_prefix="firms")
+    futures = {
+        executor.submit(
+            contextvars.copy_context().run,
+            firms_get_area_events_for_source,
+            lat=lat,
+            lon=lon,
+            source=src,
+            radius_km=radius_km,
+            day_range=day_range,
+        ): src
+        for src in sources
+    }
 
-    conf_vals: List[float] = []
-    for r in rows:
-        raw = r.get("confidence") or r.get("Confidence") or r.get("CONFIDENCE") or ""
-        try:
-            conf_vals.append(float(str(raw).strip()))
-        except Exception:
-            pass
+    results: List[Tuple[str, FirmsPoints]] = []
+    done: Dict[str, Optional[FirmsPoints]] = {}
+    last_error: Optional[str] = None
+
+    try:
+        for future in as_completed(futures, timeout=deadline):
+            src = futures[future]
+            try:
+                rows, err = future.result()
+            except Exception:
+                rows, err = None, "Не удалось получить данные FIRMS"
+
+            done[src] = rows
+            if rows is None:
+                last_error = err or last_error
+                continue
+            results.append((src, rows))
+
+            if policy != "merge":
+                for candidate in sources:
+                    if candidate not in done:
+                        break
+                    if done[candidate]:
+                        return done[candidate], candidate, None
+    except FuturesTimeout:
+        last_error = last_error or "FIRMS не ответил вовремя"
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if not results:
+        return None, None, last_error or "FIRMS недоступен или вернул ошибку"
+
+    results.sort(key=lambda item: sources.index(item[0]))
+
+    if policy == "merge":
+        return _firms_merge(results), ",".join(src for src, _ in results), None
 
-    avg_conf = (sum(conf_vals) / len(conf_vals)) if conf_vals else None
-    return len(rows), avg_conf
+    src, rows = next(((src, rows) for src, rows in results if rows), results[0])
+    return rows, src, None
+
+
+def firms_get_area_events(
+    lat: float,
+    lon: float,
+    radius_km: float = 50.0,
+    day_range: int = 7,
+    *,
+    mode: Optional[str] = None,
+    policy: Optional[str] = None,
+) -> Tuple[Optional[FirmsPoints], Optional[str], Optional[str]]:
+    sources = _firms_sources()
+    mode = (mode or getattr(settings, "FIRMS_FETCH_MODE", "sequential")).strip().lower()
+    policy = (policy or getattr(settings, "FIRMS_FANOUT_POLICY", "first")).strip().lower()
+
+    if mode == "sequential" or len(sources) == 1:
+        return _firms_sequential(sources, lat, lon, radius_km, day_range)
+
+    return _firms_parallel(sources, lat, lon, radius_km, day_range, policy)
+
+
+def firms_aggregate(points: Optional[FirmsPoints]) -> Tuple[int, Optional[float]]:
+    if points is None or not len(points):
+        return 0, None
+    return points.aggregate()
 
 
 def calc_fire_activity_score(firms_count: int, avg_confidence: Optional[float]) -> int:
@@ -266,3 +1105,16 @@ def calc_fire_activity_score(firms_count: int, avg_confidence: Optional[float])
 def calc_total_risk(weather_score: int, fire_score: int) -> int:
     score = 0.60 * float(weather_score) + 0.40 * float(fire_score)
     return int(round(max(0.0, min(100.0, score))))
+
+
+def calc_search_risk(
+    weather: WeatherResult,
+    points: Optional[FirmsPoints],
+) -> Tuple[int, Optional[int], Optional[float]]:
+    weather_score = calc_simple_fire_risk(weather.temp, weather.humidity, weather.wind_speed)
+    if points is None:
+        return calc_total_risk(weather_score, 0), None, None
+
+    firms_count, firms_avg_conf = firms_aggregate(points)
+    fire_score = calc_fire_activity_score(firms_count, firms_avg_conf)
+    return calc_total_risk(weather_score, fire_score), firms_count, firms_avg_conf
@@ -0,0 +1,48 @@
+import time
+
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.db_routers import pin_user_to_primary
+from core.metrics import record_query
+from core.models import FavoriteCity, RiskReport, WeatherSearch
+from core.page_cache import bump_user_page_version
+from core.sqlite_tuning import apply_sqlite_pragmas
+
+
+def _timed_execute(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_query(time.perf_counter() - started)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    apply_sqlite_pragmas(connection)
+
+
+def _after_user_write(user_id: int) -> None:
+    bump_user_page_version(user_id)
+    pin_user_to_primary(user_id)
+
+
+@receiver(post_save, sender=WeatherSearch)
+@receiver(post_delete, sender=WeatherSearch)
+@receiver(post_save, sender=FavoriteCity)
+@receiver(post_delete, sender=FavoriteCity)
+@receiver(post_save, sender=RiskReport)
+@receiver(post_delete, sender=RiskReport)
+def invalidate_user_pages(sender, instance, **kwargs):
+    user_id = instance.user_id
+    if user_id is not None:
+        transaction.on_commit(lambda: _after_user_write(user_id))
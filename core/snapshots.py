@@ -0,0 +1,133 @@
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, Optional
+
+from django.conf import settings
+from django.utils import timezone
+
+from core.models import CitySnapshot, FavoriteCity
+from core.services import (
+    WeatherResult,
+    calc_search_risk,
+    firms_get_area_events,
+    get_weather_by_cities,
+    normalize_city,
+)
+
+
+def snapshot_to_weather(snapshot: CitySnapshot) -> WeatherResult:
+    return WeatherResult(
+        city=snapshot.city,
+        country=snapshot.country,
+        temp=snapshot.temp,
+        feels_like=snapshot.feels_like,
+        description=snapshot.description,
+        humidity=snapshot.humidity,
+        wind_speed=snapshot.wind_speed,
+        icon_url=snapshot.icon_url,
+        lat=snapshot.lat,
+        lon=snapshot.lon,
+    )
+
+
+def fresh_snapshot_cutoff():
+    return timezone.now() - timedelta(seconds=int(getattr(settings, "SNAPSHOT_MAX_AGE", 1800)))
+
+
+def favorite_city_names() -> Dict[str, str]:
+    names: Dict[str, str] = {}
+    for key, city in FavoriteCity.objects.values_list("city_key", "city").order_by("city_key").iterator():
+        if key and key not in names:
+            names[key] = city
+    return names
+
+
+def build_snapshot(name: str, weather: WeatherResult) -> CitySnapshot:
+    points, _, _ = firms_get_area_events(weather.lat, weather.lon, radius_km=50.0, day_range=7)
+    total_risk, firms_count, firms_avg_conf = calc_search_risk(weather, points)
+
+    return CitySnapshot(
+        city_key=normalize_city(name),
+        city=weather.city,
+        refreshed_at=timezone.now(),
+        country=weather.country,
+        temp=weather.temp,
+        feels_like=weather.feels_like,
+        description=weather.description,
+        humidity=weather.humidity,
+        wind_speed=weather.wind_speed,
+        icon_url=weather.icon_url,
+        lat=weather.lat,
+        lon=weather.lon,
+        risk_score=total_risk,
+        firms_count=firms_count,
+        firms_avg_confidence=firms_avg_conf,
+    )
+
+
+def save_snapshots(snapshots: List[CitySnapshot]) -> None:
+    CitySnapshot.objects.bulk_create(
+        snapshots,
+        update_conflicts=True,
+        unique_fields=["city_key"],
+        update_fields=[
+            "city",
+            "refreshed_at",
+            "country",
+            "temp",
+            "feels_like",
+            "description",
+            "humidity",
+            "wind_speed",
+            "icon_url",
+            "lat",
+            "lon",
+            "risk_score",
+            "firms_count",
+            "firms_avg_confidence",
+        ],
+    )
+
+
+def refresh_favorite_snapshots(
+    *,
+    batch_size: int,
+    per_minute: int,
+    log: Optional[Callable[[str], None]] = None,
+) -> int:
+    names = favorite_city_names()
+    cutoff = timezone.now() - timedelta(seconds=int(getattr(settings, "SNAPSHOT_REFRESH_INTERVAL", 900)))
+    fresh = set(
+        CitySnapshot.objects.filter(city_key__in=list(names), refreshed_at__gte=cutoff).values_list(
+            "city_key", flat=True
+        )
+    )
+    pending = [name for key, name in names.items() if key not in fresh]
+
+    pause = 60.0 / max(1, per_minute)
+    refreshed = 0
+
+    for start in range(0, len(pending), batch_size):
+        names_batch = pending[start : start + batch_size]
+        weathers = get_weather_by_cities(names_batch)
+        batch: List[CitySnapshot] = []
+
+        for name in names_batch:
+            started = time.monotonic()
+            weather = weathers.get(name)
+            if weather is not None:
+                batch.append(build_snapshot(name, weather))
+            elif log:
+                log(f"Не удалось обновить: {name}")
+
+            delay = pause - (time.monotonic() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+        if batch:
+            save_snapshots(batch)
+            refreshed += len(batch)
+            if log:
+                log(f"Обновлено {refreshed} из {len(pending)}")
+
+    return refreshed
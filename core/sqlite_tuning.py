@@ -0,0 +1,23 @@
+from typing import Dict
+
+from django.conf import settings
+
+
+def sqlite_pragmas() -> Dict[str, str]:
+    if getattr(settings, "SQLITE_PROFILE", "production") != "production":
+        return {}
+    return {
+        "journal_mode": "WAL",
+        "synchronous": getattr(settings, "SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": str(getattr(settings, "SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        "mmap_size": str(getattr(settings, "SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        "cache_size": str(-getattr(settings, "SQLITE_CACHE_KB", 65536)),
+        "temp_store": "MEMORY",
+    }
+
+
+def apply_sqlite_pragmas(connection) -> None:
+    if connection.vendor != "sqlite":
+        return
+    for name, value in sqlite_pragmas().items():
+        connection.connection.execute(f"PRAGMA {name} = {value}")
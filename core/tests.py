@@ -0,0 +1,328 @@
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from core.cache_backends import DurableFileCache
+from core.models import FavoriteCity, RiskReport, UserCityStats, UserSearchStats, WeatherSearch
+from core.pagination import decode_cursor, encode_cursor, keyset_page
+from core.risk_map import parse_bbox
+from core.rollups import rebuild_risk_reports, rebuild_user_rollups, record_search, rounded_avg
+from core.scoring import as_column, score_batch
+from core.search_queue import enqueue_search, flush_search_queue, queue_length
+from core.services import (
+    _circuit_key,
+    _state_cache,
+    calc_fire_activity_score,
+    calc_simple_fire_risk,
+    calc_total_risk,
+    circuit_allows,
+    circuit_record,
+    circuit_state,
+    normalize_city,
+    single_flight,
+    upstream_cache_stats,
+)
+
+TEST_CACHES = {
+    alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"tests-{alias}"}
+    for alias in ("default", "upstream", "state", "pages")
+}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class CachedTestCase(TestCase):
+    def setUp(self):
+        for alias in TEST_CACHES:
+            caches[alias].clear()
+        self.user = get_user_model().objects.create_user(username="tester")
+
+
+class KeysetPaginationTests(CachedTestCase):
+    def setUp(self):
+        super().setUp()
+        same_moment = timezone.now() - timedelta(hours=1)
+        for i in range(7):
+            ws = WeatherSearch.objects.create(user=self.user, city=f"Город {i}", is_success=True)
+            created_at = same_moment if i < 4 else same_moment + timedelta(minutes=i)
+            WeatherSearch.objects.filter(pk=ws.pk).update(created_at=created_at)
+        self.qs = WeatherSearch.objects.filter(user=self.user)
+
+    def test_pages_cover_all_rows_once_in_order(self):
+        expected = list(self.qs.order_by("-created_at", "-id").values_list("id", flat=True))
+        seen, cursor = [], ""
+        while True:
+            page = keyset_page(self.qs, after=cursor, size=3)
+            seen += [ws.id for ws in page.items]
+            if not page.next_cursor:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+
+    def test_before_cursor_returns_previous_page(self):
+        first = keyset_page(self.qs, size=3)
+        second = keyset_page(self.qs, after=first.next_cursor, size=3)
+        back = keyset_page(self.qs, before=second.prev_cursor, size=3)
+        self.assertEqual([ws.id for ws in back.items], [ws.id for ws in first.items])
+        self.assertIsNone(back.prev_cursor)
+
+    def test_cursor_round_trip_and_garbage(self):
+        now = timezone.now()
+        self.assertEqual(decode_cursor(encode_cursor(now, 42)), (now, 42))
+        self.assertIsNone(decode_cursor("not-a-cursor"))
+
+
+class CityKeyTests(CachedTestCase):
+    def test_normalize_city(self):
+        self.assertEqual(normalize_city("  Нижний   Новгород "), "нижний новгород")
+        self.assertEqual(normalize_city("MOSCOW"), normalize_city("moscow"))
+        self.assertEqual(normalize_city(None), "")
+
+    def test_models_store_normalized_key(self):
+        ws = WeatherSearch.objects.create(user=self.user, city=" Санкт-Петербург ", is_success=False)
+        self.assertEqual(ws.city_key, "санкт-петербург")
+
+    def test_favorites_unique_per_normalized_city(self):
+        FavoriteCity.objects.create(user=self.user, city="Казань")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            FavoriteCity.objects.create(user=self.user, city="  казань")
+
+
+@override_settings(CIRCUIT_MIN_CALLS=2, CIRCUIT_ERROR_RATE=0.5, CIRCUIT_OPEN_SECONDS=30, CIRCUIT_SLOW_CALL=5)
+class CircuitBreakerTests(CachedTestCase):
+    def test_opens_after_error_rate_and_recovers_through_one_probe(self):
+        self.assertTrue(circuit_allows("api"))
+        circuit_record("api", True, 0.1)
+        circuit_record("api", False, 0.1)
+        self.assertEqual(circuit_state("api")["state"], "open")
+        self.assertFalse(circuit_allows("api"))
+
+        _state_cache().set(_circuit_key("api", "open_until"), time.time() - 1, None)
+        self.assertEqual(circuit_state("api")["state"], "half-open")
+        self.assertTrue(circuit_allows("api"))
+        self.assertFalse(circuit_allows("api"))
+
+        circuit_record("api", True, 0.1)
+        self.assertEqual(circuit_state("api")["state"], "closed")
+        self.assertTrue(circuit_allows("api"))
+
+    def test_failed_probe_reopens(self):
+        circuit_record("api", False, 0.1)
+        circuit_record("api", False, 0.1)
+        _state_cache().set(_circuit_key("api", "open_until"), time.time() - 1, None)
+        self.assertTrue(circuit_allows("api"))
+        circuit_record("api", False, 0.1)
+        self.assertEqual(circuit_state("api")["state"], "open")
+
+    def test_slow_calls_count_as_failures(self):
+        circuit_record("api", True, 10.0)
+        circuit_record("api", True, 10.0)
+        self.assertEqual(circuit_state("api")["state"], "open")
+
+
+class SingleFlightTests(CachedTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+
+        def load():
+            calls.append(1)
+            time.sleep(0.3)
+            return {"temp": 21}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight("weather", "москва", load)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"temp": 21}] * 8)
+        self.assertEqual(upstream_cache_stats("weather")["coalesced"], 7)
+
+    def test_errors_reach_every_waiter(self):
+        def fail():
+            time.sleep(0.2)
+            raise ValueError("upstream down")
+
+        errors = []
+
+        def call():
+            try:
+                single_flight("weather", "казань", fail)
+            except ValueError as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=call) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(errors), 4)
+
+
+class SharedFileCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = DurableFileCache(self.dir.name, {"OPTIONS": {"MAX_ENTRIES": 100}})
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _run_threads(self, target, count):
+        threads = [threading.Thread(target=target) for _ in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def test_add_is_exclusive(self):
+        winners = []
+        self._run_threads(lambda: winners.append(self.cache.add("lock", 1, None)), 16)
+        self.assertEqual(winners.count(True), 1)
+
+    def test_incr_loses_no_updates_and_keeps_expiry(self):
+        self.cache.add("n", 0, None)
+
+        def bump():
+            for _ in range(50):
+                self.cache.incr("n")
+
+        self._run_threads(bump, 8)
+        self.assertEqual(self.cache.get("n"), 400)
+        self.cache.add("ttl", 0, 1)
+        self.cache.incr("ttl")
+        time.sleep(1.1)
+        self.assertIsNone(self.cache.get("ttl"))
+
+    def test_cull_keeps_live_entries(self):
+        for i in range(300):
+            self.cache.set(f"k{i}", i, None)
+        self.assertEqual(self.cache.get("k0"), 0)
+        self.assertEqual(len(self.cache._list_cache_files()), 300)
+
+
+class RollupTests(CachedTestCase):
+    def test_incremental_rollups_match_rebuild(self):
+        record_search(user=self.user, city="Москва", is_success=True, temperature_c=20, risk_score=2)
+        record_search(user=self.user, city=" москва", is_success=True, temperature_c=11, risk_score=3)
+        record_search(user=self.user, city="Нигде", is_success=False, error_message="Город не найден")
+
+        report = RiskReport.objects.get(user=self.user)
+        self.assertEqual((report.risk_sum, report.searches_count, report.max_risk), (5, 2, 3))
+        self.assertEqual(report.avg_risk, 2)
+
+        stats = UserSearchStats.objects.get(user=self.user)
+        self.assertEqual((stats.total, stats.success, stats.errors), (3, 2, 1))
+        city = UserCityStats.objects.get(user=self.user, city_key="москва")
+        self.assertEqual((city.success_count, city.temp_sum, city.temp_count), (2, 31.0, 2))
+
+        self.assertEqual(rebuild_risk_reports(fix=False), [])
+        self.assertEqual(rebuild_user_rollups(fix=False), [])
+
+    def test_rounded_avg_rounds_half_to_even(self):
+        self.assertEqual([rounded_avg(5, 2), rounded_avg(7, 2), rounded_avg(8, 3)], [2, 4, 3])
+        self.assertIsNone(rounded_avg(0, 0))
+
+    def test_sql_average_matches_rounded_avg(self):
+        rng = random.Random(7)
+        scores = [rng.randint(0, 100) for _ in range(9)]
+        for score in scores:
+            record_search(user=self.user, city="Сочи", is_success=True, risk_score=score)
+        report = RiskReport.objects.get(user=self.user)
+        self.assertEqual(report.avg_risk, rounded_avg(sum(scores), len(scores)))
+
+
+class RiskMapTests(CachedTestCase):
+    def test_parse_bbox_clamps_then_validates(self):
+        self.assertEqual(parse_bbox("30,50,40,60"), (30.0, 50.0, 40.0, 60.0))
+        self.assertEqual(parse_bbox("-200,-95,200,95"), (-180.0, -90.0, 180.0, 90.0))
+        self.assertEqual(parse_bbox("30.123,50.001,30.124,50.002"), (30.12, 50.0, 30.13, 50.01))
+        for value in ("40,50,30,60", "1,2,3", "a,b,c,d", "nan,0,1,1", "0,0,1,1,1"):
+            self.assertIsNone(parse_bbox(value), value)
+
+    def test_etag_changes_after_a_new_search(self):
+        self.client.force_login(self.user)
+        first = self.client.get("/stats/map.geojson?zoom=3")
+        self.assertEqual(first.status_code, 200)
+        etag = first["ETag"]
+
+        self.assertEqual(self.client.get("/stats/map.geojson?zoom=3", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record_search(user=self.user, city="Москва", is_success=True, lat=55.75, lon=37.62, risk_score=40)
+        again = self.client.get("/stats/map.geojson?zoom=3", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again["ETag"], etag)
+
+    def test_invalid_bbox_is_rejected(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get("/stats/map.geojson?bbox=40,50,30,60").status_code, 400)
+        self.assertEqual(self.client.get("/stats/map.geojson?bbox=").status_code, 200)
+
+
+class ScoringParityTests(SimpleTestCase):
+    def test_batch_matches_scalar_formulas(self):
+        rng = random.Random(11)
+        rows = [
+            (
+                rng.choice([None, rng.uniform(-40, 45)]),
+                rng.choice([None, rng.randint(0, 100)]),
+                rng.choice([None, rng.uniform(0, 30)]),
+                rng.choice([None, rng.randint(0, 250)]),
+                rng.choice([None, rng.uniform(0, 100)]),
+            )
+            for _ in range(500)
+        ]
+        temp, humidity, wind, count, confidence = (as_column(column) for column in zip(*rows))
+        scores = score_batch(temp, humidity, wind, count, confidence)
+
+        for i, (t, h, w, c, conf) in enumerate(rows):
+            weather = calc_simple_fire_risk(t, h, w)
+            fire = calc_fire_activity_score(c, conf) if c is not None else 0
+            self.assertEqual(scores.weather[i], weather, rows[i])
+            self.assertEqual(scores.fire[i], fire, rows[i])
+            self.assertEqual(scores.total[i], calc_total_risk(weather, fire), rows[i])
+        self.assertTrue(np.isin(scores.colors, ["green", "yellow", "orange", "red"]).all())
+
+
+class SearchQueueTests(CachedTestCase):
+    def setUp(self):
+        super().setUp()
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = Path(self.dir.name) / "queue.sqlite3"
+        override = override_settings(SEARCH_WRITE_MODE="queue", SEARCH_QUEUE_PATH=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(self.dir.cleanup)
+
+    def test_redelivered_rows_are_written_once(self):
+        for city in ("Москва", "Казань", "Сочи"):
+            enqueue_search(user=self.user, city=city, is_success=True, risk_score=10)
+        with closing(sqlite3.connect(self.path)) as conn:
+            journal = conn.execute("SELECT key, payload, enqueued_at FROM search_journal").fetchall()
+
+        self.assertEqual(flush_search_queue(), 3)
+        self.assertEqual(queue_length(), 0)
+
+        with closing(sqlite3.connect(self.path)) as conn, conn:
+            conn.executemany("INSERT INTO search_journal (key, payload, enqueued_at) VALUES (?, ?, ?)", journal)
+        self.assertEqual(flush_search_queue(), 3)
+
+        self.assertEqual(WeatherSearch.objects.filter(user=self.user).count(), 3)
+        self.assertEqual(UserSearchStats.objects.get(user=self.user).total, 3)
+        self.assertEqual(queue_length(), 0)
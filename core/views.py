@@ -1,24 +1,96 @@
+import asyncio
+import csv
+import hashlib
+import json
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
-from django.db.models import Avg, Count, F, Max, OuterRef, Subquery
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import condition, require_POST
 
+from core.db_routers import read_from_replica
 from core.forms import CitySearchForm, SignUpForm
-from core.models import FavoriteCity, RiskReport, WeatherSearch
+from core.models import CitySnapshot, FavoriteCity, RiskReport, UserCityStats, UserSearchStats
+from core.queries import (
+    city_temperature_history,
+    favorite_lookup,
+    favorites_with_last_search,
+    report_searches,
+    user_city_stats,
+    user_reports,
+    user_searches,
+)
+from core.metrics import metrics_registry, render_shared_metrics
+from core.page_cache import cached_page_context, page_cache_stats, user_page_version
+from core.pagination import keyset_page
+from core.risk_map import parse_bbox, parse_zoom, risk_map_geojson
+from core.rollups import attach_latest_search
+from core.search_queue import log_search
 from core.services import (
-    calc_fire_activity_score,
-    calc_simple_fire_risk,
-    calc_total_risk,
-    firms_aggregate,
+    FirmsPoints,
+    WeatherResult,
+    calc_search_risk,
+    circuit_state,
     firms_get_area_events,
     get_weather_by_city,
-    risk_color,
+    http_client_stats,
+    normalize_city,
+    upstream_cache_stats,
+)
+from core.snapshots import fresh_snapshot_cutoff, snapshot_to_weather
+
+EXPORT_FIELDS = (
+    "created_at",
+    "city",
+    "is_success",
+    "error_message",
+    "temperature_c",
+    "description",
+    "humidity",
+    "wind_speed",
+    "lat",
+    "lon",
+    "risk_score",
+    "firms_count",
+    "firms_avg_confidence",
+)
+
+_upstream_executor = ThreadPoolExecutor(
+    max_workers=int(getattr(settings, "UPSTREAM_WORKERS", 16)),
+    thread_name_prefix="upstream",
+)
+_firms_executor = ThreadPoolExecutor(
+    max_workers=int(getattr(settings, "FIRMS_WORKERS", 8)),
+    thread_name_prefix="firms",
 )
 
 
+def metrics_view(request):
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        allowed = request.headers.get("Authorization", "") == f"Bearer {token}"
+    else:
+        allowed = settings.DEBUG or request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden()
+
+    shared = render_shared_metrics(
+        {name: circuit_state(name)["state"] for name in ("openweather", "firms")},
+        {name: upstream_cache_stats(name) for name in ("weather", "firms")},
+        page_cache_stats(),
+        http_client_stats(),
+    )
+    return HttpResponse(metrics_registry().render() + shared, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 def home_view(request):
     return render(request, "core/home.html")
 
@@ -36,30 +108,26 @@ def signup_view(request):
     return render(request, "registration/signup.html", {"form": form})
 
 
-def _update_daily_report(user, weather_search_obj: WeatherSearch) -> None:
-    if user is None or not getattr(user, "is_authenticated", False):
-        return
-
-    report, _ = RiskReport.objects.get_or_create(user=user, day=timezone.localdate())
-    report.searches.add(weather_search_obj)
-
-    agg = report.searches.filter(risk_score__isnull=False).aggregate(
-        avg_val=Avg("risk_score"),
-        max_val=Max("risk_score"),
-        cnt=Count("id"),
-    )
-
-    report.searches_count = int(agg.get("cnt") or 0)
-
-    avg_val = agg.get("avg_val")
-    max_val = agg.get("max_val")
+async def _firms_within_budget(weather: WeatherResult) -> Optional[FirmsPoints]:
+    budget = float(getattr(settings, "FIRMS_SEARCH_BUDGET", 6))
+    try:
+        firms_rows, _, _ = await asyncio.wait_for(
+            sync_to_async(firms_get_area_events, thread_sensitive=False, executor=_firms_executor)(
+                weather.lat,
+                weather.lon,
+                radius_km=50.0,
+                day_range=7,
+            ),
+            timeout=budget,
+        )
+    except asyncio.TimeoutError:
+        return None
+    return firms_rows
 
-    report.avg_risk = int(round(float(avg_val))) if avg_val is not None else None
-    report.max_risk = int(max_val) if max_val is not None else None
-    report.save(update_fields=["searches_count", "avg_risk", "max_risk"])
 
+async def weather_search_view(request):
+    user = await request.auser()
 
-def weather_search_view(request):
     initial_city = (request.GET.get("city") or "").strip()
     initial = {"city": initial_city} if initial_city else None
     form = CitySearchForm(request.POST or None, initial=initial)
@@ -70,33 +138,44 @@ def weather_search_view(request):
 
     if request.method == "POST" and form.is_valid():
         city = form.cleaned_data["city"]
-        weather = get_weather_by_city(city)
+        snapshot = await CitySnapshot.objects.filter(
+            city_key=normalize_city(city),
+            refreshed_at__gte=fresh_snapshot_cutoff(),
+        ).afirst()
+
+        if snapshot is not None:
+            weather = snapshot_to_weather(snapshot)
+        else:
+            weather = await sync_to_async(
+                get_weather_by_city,
+                thread_sensitive=False,
+                executor=_upstream_executor,
+            )(city)
 
         if weather is None:
             error_message = "Не удалось получить данные. Проверьте название города или попробуйте позже."
-            if request.user.is_authenticated:
-                WeatherSearch.objects.create(
-                    user=request.user,
+            if user.is_authenticated:
+                await sync_to_async(log_search)(
+                    user=user,
                     city=city,
                     is_success=False,
                     error_message=error_message,
                 )
         else:
-            if request.user.is_authenticated:
-                weather_score = calc_simple_fire_risk(weather.temp, weather.humidity, weather.wind_speed)
-
-                firms_rows, _, _ = firms_get_area_events(
-                    weather.lat,
-                    weather.lon,
-                    radius_km=50.0,
-                    day_range=7,
-                )
-                firms_count, firms_avg_conf = firms_aggregate(firms_rows)
-                fire_score = calc_fire_activity_score(firms_count, firms_avg_conf) if firms_rows is not None else 0
-                total_risk = calc_total_risk(weather_score, fire_score)
-
-                ws = WeatherSearch.objects.create(
-                    user=request.user,
+            if user.is_authenticated:
+                favorite_exists = favorite_lookup(user, weather.city).aexists()
+
+                if snapshot is not None:
+                    total_risk = snapshot.risk_score
+                    firms_count = snapshot.firms_count
+                    firms_avg_conf = snapshot.firms_avg_confidence
+                    is_favorite = await favorite_exists
+                else:
+                    firms_points, is_favorite = await asyncio.gather(_firms_within_budget(weather), favorite_exists)
+                    total_risk, firms_count, firms_avg_conf = calc_search_risk(weather, firms_points)
+
+                await sync_to_async(log_search)(
+                    user=user,
                     city=weather.city,
                     is_success=True,
                     temperature_c=int(round(weather.temp)),
@@ -106,20 +185,11 @@ def weather_search_view(request):
                     lat=float(weather.lat),
                     lon=float(weather.lon),
                     risk_score=int(total_risk),
-                    firms_count=int(firms_count) if firms_rows is not None else None,
-                    firms_avg_confidence=float(firms_avg_conf)
-                    if (firms_rows is not None and firms_avg_conf is not None)
-                    else None,
+                    firms_count=firms_count,
+                    firms_avg_confidence=firms_avg_conf,
                 )
 
-                _update_daily_report(request.user, ws)
-
-                is_favorite = FavoriteCity.objects.filter(
-                    user=request.user,
-                    city__iexact=weather.city,
-                ).exists()
-
-    return render(
+    return await sync_to_async(render)(
         request,
         "core/weather_search.html",
         {
@@ -132,81 +202,135 @@ def weather_search_view(request):
 
 
 @login_required
+@read_from_replica
 def favorites_view(request):
     sort = (request.GET.get("sort") or "alpha").strip().lower()
 
-    last_success = (
-        WeatherSearch.objects.filter(user=request.user, is_success=True, city=OuterRef("city"))
-        .order_by("-created_at")
-    )
-
-    qs = FavoriteCity.objects.filter(user=request.user).annotate(
-        last_time=Subquery(last_success.values("created_at")[:1]),
-        last_temp=Subquery(last_success.values("temperature_c")[:1]),
-        last_risk=Subquery(last_success.values("risk_score")[:1]),
-        last_firms_count=Subquery(last_success.values("firms_count")[:1]),
-        last_firms_conf=Subquery(last_success.values("firms_avg_confidence")[:1]),
-    )
+    favorites = list(favorites_with_last_search(request.user))
+    snapshots = {
+        snap.city_key: snap
+        for snap in CitySnapshot.objects.filter(city_key__in={f.city_key for f in favorites})
+    }
+
+    for item in favorites:
+        snap = snapshots.get(item.city_key)
+        if snap is not None and (item.last_time is None or snap.refreshed_at > item.last_time):
+            item.last_time = snap.refreshed_at
+            item.last_temp = int(round(snap.temp))
+            item.last_risk = snap.risk_score
+            item.last_firms_count = snap.firms_count
+            item.last_firms_conf = snap.firms_avg_confidence
 
     if sort == "risk":
-        qs = qs.order_by(F("last_risk").desc(nulls_last=True), "city")
+        favorites.sort(key=lambda f: (f.last_risk is None, -(f.last_risk or 0)))
     elif sort == "last":
-        qs = qs.order_by(F("last_time").desc(nulls_last=True), "city")
-    else:
-        qs = qs.order_by("city")
+        favorites.sort(key=lambda f: (f.last_time is None, -(f.last_time.timestamp() if f.last_time else 0)))
 
-    return render(request, "core/favorites.html", {"favorites": qs, "sort": sort})
+    return render(request, "core/favorites.html", {"favorites": favorites, "sort": sort})
 
 
 @login_required
 def history_view(request):
-    history = WeatherSearch.objects.filter(user=request.user).order_by("-created_at")[:50]
-    return render(request, "core/history.html", {"history": history})
+    page = keyset_page(
+        user_searches(request.user),
+        after=request.GET.get("after", ""),
+        before=request.GET.get("before", ""),
+    )
+    return render(request, "core/history.html", {"history": page.items, "page": page})
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def _export_line(item: dict, fmt: str, writer) -> str:
+    item["created_at"] = item["created_at"].isoformat()
+    if fmt == "ndjson":
+        return json.dumps(item, ensure_ascii=False) + "\n"
+    return writer.writerow([item[f] for f in EXPORT_FIELDS])
+
+
+def _export_rows(user, fmt: str):
+    writer = csv.writer(_Echo())
+    if fmt != "ndjson":
+        yield writer.writerow(EXPORT_FIELDS)
+    for item in user_searches(user).values(*EXPORT_FIELDS).iterator(chunk_size=2000):
+        yield _export_line(item, fmt, writer)
+
+
+async def _aexport_rows(user, fmt: str):
+    writer = csv.writer(_Echo())
+    if fmt != "ndjson":
+        yield writer.writerow(EXPORT_FIELDS)
+    async for item in user_searches(user).values(*EXPORT_FIELDS).aiterator(chunk_size=2000):
+        yield _export_line(item, fmt, writer)
 
 
 @login_required
-def profile_view(request):
-    favorites_count = FavoriteCity.objects.filter(user=request.user).count()
-    history_count = WeatherSearch.objects.filter(user=request.user).count()
+def history_export_view(request):
+    fmt = (request.GET.get("format") or "csv").strip().lower()
+    if fmt not in ("csv", "ndjson"):
+        fmt = "csv"
+
+    rows = _aexport_rows if isinstance(request, ASGIRequest) else _export_rows
+    response = StreamingHttpResponse(
+        rows(request.user, fmt),
+        content_type="application/x-ndjson" if fmt == "ndjson" else "text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="history.{fmt}"'
+    return response
 
-    last_searches = WeatherSearch.objects.filter(user=request.user).order_by("-created_at")[:5]
+
+def _profile_context(user) -> dict:
+    stats = UserSearchStats.objects.filter(user=user).first()
 
     top_cities = (
-        WeatherSearch.objects.filter(user=request.user, is_success=True)
-        .values("city")
-        .annotate(cnt=Count("id"))
+        UserCityStats.objects.filter(user=user)
+        .annotate(cnt=F("success_count"))
+        .values("city", "cnt")
         .order_by("-cnt", "city")[:5]
     )
 
-    last_report = RiskReport.objects.filter(user=request.user).order_by("-day", "-created_at").first()
-
-    return render(
-        request,
-        "core/profile.html",
-        {
-            "favorites_count": favorites_count,
-            "history_count": history_count,
-            "last_searches": last_searches,
-            "top_cities": top_cities,
-            "last_report": last_report,
-        },
-    )
+    return {
+        "favorites_count": FavoriteCity.objects.filter(user=user).count(),
+        "history_count": stats.total if stats else 0,
+        "last_searches": list(user_searches(user)[:5]),
+        "top_cities": list(top_cities),
+        "last_report": user_reports(user).first(),
+    }
 
 
 @login_required
-def stats_view(request):
-    total = WeatherSearch.objects.filter(user=request.user).count()
-    ok = WeatherSearch.objects.filter(user=request.user, is_success=True).count()
-    err = WeatherSearch.objects.filter(user=request.user, is_success=False).count()
-
-    cities = list(
-        WeatherSearch.objects.filter(user=request.user, is_success=True, temperature_c__isnull=False)
-        .values_list("city", flat=True)
-        .order_by("city")
-        .distinct()
-    )
+@read_from_replica
+def profile_view(request):
+    context = cached_page_context("profile", request.user.id, lambda: _profile_context(request.user))
+    return render(request, "core/profile.html", context)
+
+
+def _map_bounds(city_stats) -> str:
+    coords = [
+        (row.last_search.lon, row.last_search.lat)
+        for row in city_stats
+        if row.last_search is not None and row.last_search.lat is not None
+    ]
+    if not coords:
+        return ""
+    lons = [lon for lon, _ in coords]
+    lats = [lat for _, lat in coords]
+    return ",".join(str(v) for v in (min(lons), min(lats), max(lons), max(lats)))
+
+
+def _stats_context(user, selected_city: str) -> dict:
+    stats = UserSearchStats.objects.filter(user=user).first()
+    total = stats.total if stats else 0
+    ok = stats.success if stats else 0
+    err = stats.errors if stats else 0
+
+    city_stats = list(user_city_stats(user))
+
+    cities = [row.city for row in city_stats if row.temp_count]
 
-    selected_city = (request.GET.get("city") or "").strip()
     if not selected_city and cities:
         selected_city = cities[0]
 
@@ -214,92 +338,93 @@ def stats_view(request):
     chart_temps = []
 
     if selected_city:
-        qs = (
-            WeatherSearch.objects.filter(
-                user=request.user,
-                is_success=True,
-                temperature_c__isnull=False,
-                city__iexact=selected_city,
-            )
-            .order_by("-created_at")[:50]
-        )
-        rows = list(reversed(list(qs)))
+        rows = list(reversed(list(city_temperature_history(user, selected_city)[:50])))
         chart_labels = [r.created_at.strftime("%d.%m %H:%M") for r in rows]
         chart_temps = [r.temperature_c for r in rows]
 
-    top_cities = (
-        WeatherSearch.objects.filter(user=request.user, is_success=True)
-        .values("city")
-        .annotate(cnt=Count("id"), avg_temp=Avg("temperature_c"))
-        .order_by("-cnt", "city")[:10]
+    top_cities = [
+        {"city": row.city, "cnt": row.success_count, "avg_temp": row.avg_temp}
+        for row in sorted(city_stats, key=lambda row: -row.success_count)[:10]
+    ]
+
+    return {
+        "total": total,
+        "ok": ok,
+        "err": err,
+        "cities": cities,
+        "selected_city": selected_city,
+        "chart_labels": chart_labels,
+        "chart_temps": chart_temps,
+        "top_cities": top_cities,
+        "map_bounds": _map_bounds(city_stats),
+    }
+
+
+@login_required
+@read_from_replica
+def stats_view(request):
+    selected_city = (request.GET.get("city") or "").strip()
+    context = cached_page_context(
+        "stats",
+        request.user.id,
+        lambda: _stats_context(request.user, selected_city),
+        normalize_city(selected_city),
     )
+    return render(request, "core/stats.html", context)
 
-    recent = WeatherSearch.objects.filter(
-        user=request.user,
-        is_success=True,
-        lat__isnull=False,
-        lon__isnull=False,
-    ).order_by("-created_at")[:200]
-
-    seen = set()
-    markers = []
-
-    for r in recent:
-        key = (r.city or "").strip().lower()
-        if not key or key in seen:
-            continue
-        seen.add(key)
-
-        score = (
-            r.risk_score
-            if r.risk_score is not None
-            else calc_simple_fire_risk(r.temperature_c, r.humidity, r.wind_speed)
-        )
 
-        markers.append(
-            {
-                "city": r.city,
-                "lat": float(r.lat),
-                "lon": float(r.lon),
-                "temp": r.temperature_c,
-                "humidity": r.humidity,
-                "wind": r.wind_speed,
-                "score": int(score),
-                "color": risk_color(int(score)),
-                "firms_count": r.firms_count,
-                "firms_avg_confidence": r.firms_avg_confidence,
-                "time": r.created_at.strftime("%d.%m.%Y %H:%M"),
-            }
-        )
+def _risk_map_params(request):
+    return parse_bbox(request.GET.get("bbox", "")), parse_zoom(request.GET.get("zoom"))
 
-    return render(
-        request,
-        "core/stats.html",
-        {
-            "total": total,
-            "ok": ok,
-            "err": err,
-            "cities": cities,
-            "selected_city": selected_city,
-            "chart_labels": chart_labels,
-            "chart_temps": chart_temps,
-            "top_cities": top_cities,
-            "markers": markers,
-        },
+
+def _risk_map_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    bbox, zoom = _risk_map_params(request)
+    raw = f"{request.user.id}:{user_page_version(request.user.id)}:{bbox}:{zoom}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+@login_required
+@condition(etag_func=_risk_map_etag)
+@read_from_replica
+def risk_map_view(request):
+    bbox, zoom = _risk_map_params(request)
+    if bbox is None and request.GET.get("bbox"):
+        return HttpResponseBadRequest("bbox: ожидается min_lon,min_lat,max_lon,max_lat, min не больше max")
+    payload = cached_page_context(
+        "risk_map",
+        request.user.id,
+        lambda: risk_map_geojson(request.user, bbox, zoom),
+        ",".join(map(str, bbox)) if bbox else "",
+        str(zoom),
     )
+    response = JsonResponse(payload)
+    response["Cache-Control"] = "private, no-cache"
+    return response
 
 
 @login_required
+@read_from_replica
 def reports_view(request):
-    reports = RiskReport.objects.filter(user=request.user).order_by("-day", "-created_at")[:60]
-    return render(request, "core/reports.html", {"reports": reports})
+    context = cached_page_context(
+        "reports",
+        request.user.id,
+        lambda: {"reports": list(user_reports(request.user)[:60])},
+    )
+    return render(request, "core/reports.html", context)
 
 
 @login_required
+@read_from_replica
 def report_detail_view(request, report_id: int):
     report = get_object_or_404(RiskReport, id=report_id, user=request.user)
-    searches = report.searches.all().order_by("-created_at")[:200]
-    return render(request, "core/report_detail.html", {"report": report, "searches": searches})
+    page = keyset_page(
+        report_searches(report),
+        after=request.GET.get("after", ""),
+        before=request.GET.get("before", ""),
+    )
+    return render(request, "core/report_detail.html", {"report": report, "searches": page.items, "page": page})
 
 
 @login_required
@@ -311,10 +436,11 @@ def toggle_favorite_city_view(request):
     if not city_name:
         return redirect(next_url)
 
-    obj = FavoriteCity.objects.filter(user=request.user, city__iexact=city_name).first()
+    obj = favorite_lookup(request.user, city_name).first()
     if obj:
         obj.delete()
     else:
-        FavoriteCity.objects.create(user=request.user, city=city_name)
+        obj = FavoriteCity.objects.create(user=request.user, city=city_name)
+        attach_latest_search(FavoriteCity.objects.filter(pk=obj.pk))
 
     return redirect(next_url)